@@ -8,6 +8,9 @@ from src.opencode_api.routes import session_router, provider_router, event_route
 from src.opencode_api.provider import register_provider, AnthropicProvider, OpenAIProvider, LiteLLMProvider, GeminiProvider
 from src.opencode_api.tool import register_tool, WebSearchTool, WebFetchTool, TodoTool, QuestionTool, SkillTool
 from src.opencode_api.core.config import settings
+from src.opencode_api.core.storage import Storage
+from src.opencode_api.session.message import flush_parts as flush_message_parts
+from src.opencode_api.tool.webfetch import close_client as close_webfetch_client
 
 
 @asynccontextmanager
@@ -25,6 +28,12 @@ async def lifespan(app: FastAPI):
     register_tool(SkillTool())
     
     yield
+    
+    await close_webfetch_client()
+    
+    # write-behind 대기 중인 파일 쓰기 / Supabase 파트 insert 반영
+    await Storage.flush()
+    await flush_message_parts()
 
 
 app = FastAPI(
@@ -3,6 +3,7 @@
 from typing import TypeVar, Generic, Callable, Dict, List, Any, Optional, Awaitable
 from pydantic import BaseModel
 import asyncio
+import json
 from dataclasses import dataclass, field
 import uuid
 
@@ -29,6 +30,13 @@ class EventInstance:
     """An actual event instance with data"""
     type: str
     payload: Dict[str, Any]
+    _json: Optional[str] = field(default=None, repr=False, compare=False)
+    
+    def to_json(self) -> str:
+        """SSE 전송용 JSON - 구독자 수와 무관하게 한 번만 직렬화"""
+        if self._json is None:
+            self._json = json.dumps({"type": self.type, "payload": self.payload}, default=str)
+        return self._json
 
 
 class Bus:
@@ -0,0 +1,25 @@
+"""UTC clock helpers for OpenCode API"""
+
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+import time
+
+
+# 현재 스텝 시작 시각 - 스텝 안에서 생성되는 레코드가 같은 시각을 공유
+_step_now: ContextVar[Optional[datetime]] = ContextVar("step_now", default=None)
+
+
+def utc_now() -> datetime:
+    """time.time_ns() 기반 UTC 시각 (datetime.utcnow() 대체)"""
+    return datetime.fromtimestamp(time.time_ns() / 1e9, tz=timezone.utc)
+
+
+def set_step_now(now: Optional[datetime]) -> None:
+    """스텝 시각 설정 (None이면 해제)"""
+    _step_now.set(now)
+
+
+def step_now() -> datetime:
+    """스텝 진행 중이면 스텝 시작 시각, 아니면 현재 시각"""
+    return _step_now.get() or utc_now()
@@ -35,6 +35,9 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = Field(default=None, alias="OPENAI_API_KEY")
     google_api_key: Optional[str] = Field(default=None, alias="GOOGLE_API_KEY")
     
+    # Tools
+    max_parallel_tools: int = Field(default=8, alias="OPENCODE_MAX_PARALLEL_TOOLS")
+    
     # Storage
     storage_path: str = Field(default="/tmp/opencode-api", alias="OPENCODE_STORAGE_PATH")
     
@@ -2,7 +2,7 @@
 
 from ulid import ULID
 from datetime import datetime
-from typing import Literal
+from typing import Literal, Optional
 
 
 PrefixType = Literal["session", "message", "part", "tool", "question"]
@@ -22,10 +22,19 @@ class Identifier:
         "question": "qst",
     }
     
+    _last: Optional[ULID] = None
+    
     @classmethod
     def generate(cls, prefix: PrefixType) -> str:
-        """Generate a new ULID with prefix"""
+        """Generate a new ULID with prefix.
+        
+        Monotonic within a process: IDs generated in the same millisecond
+        are incremented from the previous one so id order == creation order.
+        """
         ulid = ULID()
+        if cls._last is not None and int(ulid) <= int(cls._last):
+            ulid = ULID.from_int(int(cls._last) + 1)
+        cls._last = ulid
         prefix_str = cls.PREFIXES.get(prefix, prefix[:3])
         return f"{prefix_str}_{str(ulid).lower()}"
     
@@ -3,7 +3,7 @@ from fastapi import HTTPException, Depends
 from pydantic import BaseModel
 
 from .auth import AuthUser, require_auth
-from .supabase import get_client, is_enabled as supabase_enabled
+from .supabase import get_client, is_enabled as supabase_enabled, run_sync
 from .config import settings
 
 
@@ -27,7 +27,7 @@ async def get_usage(user_id: str) -> UsageInfo:
         return UsageInfo()
     
     client = get_client()
-    result = client.rpc("get_opencode_usage", {"p_user_id": user_id}).execute()
+    result = await run_sync(client.rpc("get_opencode_usage", {"p_user_id": user_id}).execute)
     
     if result.data and len(result.data) > 0:
         row = result.data[0]
@@ -44,11 +44,11 @@ async def increment_usage(user_id: str, input_tokens: int = 0, output_tokens: in
         return
     
     client = get_client()
-    client.rpc("increment_opencode_usage", {
+    await run_sync(client.rpc("increment_opencode_usage", {
         "p_user_id": user_id,
         "p_input_tokens": input_tokens,
         "p_output_tokens": output_tokens,
-    }).execute()
+    }).execute)
 
 
 async def check_quota(user: AuthUser = Depends(require_auth)) -> AuthUser:
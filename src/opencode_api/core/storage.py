@@ -1,15 +1,38 @@
 """Storage module for OpenCode API - In-memory with optional file persistence"""
 
-from typing import TypeVar, Generic, Optional, Dict, Any, List, AsyncIterator
+from typing import TypeVar, Generic, Optional, Dict, Any, List, AsyncIterator, Tuple
 from pydantic import BaseModel
 import json
+import logging
 import os
+import shutil
 from pathlib import Path
 import asyncio
 from .config import settings
 
+try:
+    import orjson
+except ImportError:  # optional - stdlib json fallback
+    orjson = None
+
 T = TypeVar("T", bound=BaseModel)
 
+logger = logging.getLogger(__name__)
+
+
+def _dumps(value: Any) -> bytes:
+    """JSON 직렬화 (orjson 있으면 사용)"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str).encode()
+
+
+def _loads(data: bytes) -> Any:
+    """JSON 역직렬화 (orjson 있으면 사용)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 class NotFoundError(Exception):
     """Raised when a storage item is not found"""
@@ -22,10 +45,23 @@ class Storage:
     """
     Simple storage system using in-memory dict with optional file persistence.
     Keys are lists of strings that form a path (e.g., ["session", "project1", "ses_123"])
+    
+    File persistence for message records (WRITE_BEHIND_PREFIXES) is write-behind:
+    writes update memory immediately and the latest value per key is flushed to
+    disk after FLUSH_INTERVAL, so repeated writes to the same key (e.g. streaming
+    part updates) hit the disk once. Every other key (sessions, todos, the session
+    index) is still persisted before write() returns.
     """
     
     _data: Dict[str, Any] = {}
+    _dirty: Dict[str, Tuple[List[str], int]] = {}  # path -> (key, write seq), not yet persisted
+    _seq = 0
+    _flush_task: Optional[asyncio.Task] = None
     _lock = asyncio.Lock()
+    _flush_lock = asyncio.Lock()  # 파일 쓰기/삭제 순서 보장 (flush끼리, flush와 remove 사이)
+    
+    FLUSH_INTERVAL = 0.1  # seconds
+    WRITE_BEHIND_PREFIXES = frozenset({"message", "part", "message-meta"})
     
     @classmethod
     def _key_to_path(cls, key: List[str]) -> str:
@@ -37,6 +73,11 @@ class Storage:
         """Get file path for persistent storage"""
         return Path(settings.storage_path) / "/".join(key[:-1]) / f"{key[-1]}.json"
     
+    @staticmethod
+    def _write_file(file_path: Path, payload: bytes) -> None:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(payload)
+    
     @classmethod
     async def write(cls, key: List[str], data: BaseModel | Dict[str, Any]) -> None:
         """Write data to storage"""
@@ -47,13 +88,74 @@ class Storage:
         else:
             value = data
         
+        if key[0] not in cls.WRITE_BEHIND_PREFIXES:
+            async with cls._flush_lock:
+                async with cls._lock:
+                    cls._data[path] = value
+                    payload = _dumps(value)
+                await asyncio.to_thread(cls._write_file, cls._file_path(key), payload)
+            return
+        
         async with cls._lock:
             cls._data[path] = value
+            cls._seq += 1
+            cls._dirty[path] = (key, cls._seq)
+        
+        if cls._flush_task is None or cls._flush_task.done():
+            cls._flush_task = asyncio.get_running_loop().create_task(cls._flush_later())
+    
+    @classmethod
+    async def _flush_later(cls) -> None:
+        await asyncio.sleep(cls.FLUSH_INTERVAL)
+        try:
+            await cls.flush()
+        except Exception:
+            # 실패한 키는 dirty로 남아 다음 write/flush에서 재시도
+            logger.exception("Storage write-behind flush failed")
+    
+    @classmethod
+    async def flush(cls) -> None:
+        """Persist all pending writes to file
+        
+        A key leaves the dirty set only after its file write succeeds; failed keys
+        stay dirty and the first error is re-raised.
+        """
+        async with cls._flush_lock:
+            async with cls._lock:
+                # 직렬화는 루프에서 (값이 제자리 수정될 수 있음), 파일 I/O만 워커 스레드에서
+                batch = [
+                    (path, seq, cls._file_path(key), _dumps(cls._data[path]))
+                    for path, (key, seq) in cls._dirty.items()
+                    if path in cls._data
+                ]
+            if not batch:
+                return
             
-            # Persist to file
-            file_path = cls._file_path(key)
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(json.dumps(value, default=str))
+            errors = await asyncio.to_thread(cls._write_batch, batch)
+            
+            async with cls._lock:
+                for path, seq, _, _ in batch:
+                    if path in errors:
+                        continue
+                    # flush 도중 다시 쓰인 키는 dirty 유지
+                    entry = cls._dirty.get(path)
+                    if entry is not None and entry[1] == seq:
+                        del cls._dirty[path]
+        
+        if errors:
+            for path, error in errors.items():
+                logger.error("Storage flush failed for %s: %s", path, error)
+            raise next(iter(errors.values()))
+    
+    @classmethod
+    def _write_batch(cls, batch: List[Tuple[str, int, Path, bytes]]) -> Dict[str, OSError]:
+        errors: Dict[str, OSError] = {}
+        for path, _, file_path, payload in batch:
+            try:
+                cls._write_file(file_path, payload)
+            except OSError as e:
+                errors[path] = e
+        return errors
     
     @classmethod
     async def read(cls, key: List[str], model: type[T] = None) -> Optional[T | Dict[str, Any]]:
@@ -71,7 +173,7 @@ class Storage:
             # Check file
             file_path = cls._file_path(key)
             if file_path.exists():
-                data = json.loads(file_path.read_text())
+                data = _loads(file_path.read_bytes())
                 cls._data[path] = data
                 if model:
                     return model(**data)
@@ -79,6 +181,38 @@ class Storage:
         
         return None
     
+    @classmethod
+    async def read_many(cls, keys: List[List[str]]) -> List[Optional[Dict[str, Any]]]:
+        """Read several keys at once - file misses are loaded in a single worker thread call"""
+        paths = [cls._key_to_path(key) for key in keys]
+        
+        async with cls._lock:
+            results = [cls._data.get(path) for path in paths]
+            misses = [i for i, data in enumerate(results) if data is None]
+        
+        if misses:
+            # 디스크 읽기는 전역 락 밖에서 - _flush_lock으로 remove/write-through와만 순서 보장
+            async with cls._flush_lock:
+                loaded = await asyncio.to_thread(
+                    lambda: [cls._load_file(cls._file_path(keys[i])) for i in misses]
+                )
+                async with cls._lock:
+                    for i, data in zip(misses, loaded):
+                        # 읽는 동안 메모리에 새로 쓰인 값이 있으면 그쪽이 최신
+                        current = cls._data.get(paths[i])
+                        if current is None and data is not None:
+                            cls._data[paths[i]] = current = data
+                        results[i] = current
+        
+        return results
+    
+    @staticmethod
+    def _load_file(file_path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return _loads(file_path.read_bytes())
+        except FileNotFoundError:
+            return None
+    
     @classmethod
     async def read_or_raise(cls, key: List[str], model: type[T] = None) -> T | Dict[str, Any]:
         """Read data from storage or raise NotFoundError"""
@@ -109,12 +243,28 @@ class Storage:
         """Remove data from storage"""
         path = cls._key_to_path(key)
         
-        async with cls._lock:
-            cls._data.pop(path, None)
+        async with cls._flush_lock:
+            async with cls._lock:
+                cls._data.pop(path, None)
+                cls._dirty.pop(path, None)
             
             file_path = cls._file_path(key)
-            if file_path.exists():
-                file_path.unlink()
+            await asyncio.to_thread(file_path.unlink, missing_ok=True)
+    
+    @classmethod
+    async def remove_prefix(cls, prefix: List[str]) -> None:
+        """Remove every key under a prefix (one directory removal instead of per-key unlinks)"""
+        prefix_path = cls._key_to_path(prefix) + "/"
+        
+        async with cls._flush_lock:
+            async with cls._lock:
+                for path in [path for path in cls._data if path.startswith(prefix_path)]:
+                    del cls._data[path]
+                for path in [path for path in cls._dirty if path.startswith(prefix_path)]:
+                    del cls._dirty[path]
+            
+            # 디렉토리 삭제는 워커 스레드에서 - 파일이 많아도 이벤트 루프/전역 락을 잡지 않음
+            await asyncio.to_thread(shutil.rmtree, Path(settings.storage_path) / "/".join(prefix), ignore_errors=True)
     
     @classmethod
     async def list(cls, prefix: List[str]) -> List[List[str]]:
@@ -141,5 +291,7 @@ class Storage:
     @classmethod
     async def clear(cls) -> None:
         """Clear all storage"""
+        await cls.flush()
         async with cls._lock:
             cls._data.clear()
+            cls._dirty.clear()
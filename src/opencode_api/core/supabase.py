@@ -1,8 +1,11 @@
 from typing import Optional
+import asyncio
+import threading
 from supabase import create_client, Client
 from .config import settings
 
 _client: Optional[Client] = None
+_client_lock = threading.Lock()
 
 
 def get_client() -> Optional[Client]:
@@ -14,12 +17,20 @@ def get_client() -> Optional[Client]:
     if not settings.supabase_url or not settings.supabase_service_key:
         return None
     
-    _client = create_client(
-        settings.supabase_url,
-        settings.supabase_service_key
-    )
+    # executor 스레드에서 동시에 호출되어도 클라이언트는 하나만 생성 (double-checked)
+    with _client_lock:
+        if _client is None:
+            _client = create_client(
+                settings.supabase_url,
+                settings.supabase_service_key
+            )
     return _client
 
 
 def is_enabled() -> bool:
     return settings.supabase_url is not None and settings.supabase_service_key is not None
+
+
+async def run_sync(fn, *args, **kwargs):
+    """동기 Supabase 호출을 워커 스레드에서 실행 - 이벤트 루프 블로킹 방지"""
+    return await asyncio.to_thread(fn, *args, **kwargs)
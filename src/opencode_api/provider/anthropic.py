@@ -8,11 +8,51 @@ from .provider import BaseProvider, ModelInfo, Message, StreamChunk, ToolCall
 MODELS_WITH_EXTENDED_THINKING = {"claude-sonnet-4-20250514", "claude-opus-4-20250514"}
 
 
+def _build_models() -> Dict[str, ModelInfo]:
+    return {
+        "claude-sonnet-4-20250514": ModelInfo(
+            id="claude-sonnet-4-20250514",
+            name="Claude Sonnet 4",
+            provider_id="anthropic",
+            context_limit=200000,
+            output_limit=64000,
+            supports_tools=True,
+            supports_streaming=True,
+            cost_input=3.0,
+            cost_output=15.0,
+        ),
+        "claude-opus-4-20250514": ModelInfo(
+            id="claude-opus-4-20250514",
+            name="Claude Opus 4",
+            provider_id="anthropic",
+            context_limit=200000,
+            output_limit=32000,
+            supports_tools=True,
+            supports_streaming=True,
+            cost_input=15.0,
+            cost_output=75.0,
+        ),
+        "claude-3-5-haiku-20241022": ModelInfo(
+            id="claude-3-5-haiku-20241022",
+            name="Claude 3.5 Haiku",
+            provider_id="anthropic",
+            context_limit=200000,
+            output_limit=8192,
+            supports_tools=True,
+            supports_streaming=True,
+            cost_input=0.8,
+            cost_output=4.0,
+        ),
+    }
+
+
 class AnthropicProvider(BaseProvider):
     
     def __init__(self, api_key: Optional[str] = None):
         self._api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
         self._client = None
+        # 모델 목록은 고정 - 접근마다 ModelInfo를 다시 만들지 않도록 한 번만 생성
+        self._models = _build_models()
     
     @property
     def id(self) -> str:
@@ -24,41 +64,7 @@ class AnthropicProvider(BaseProvider):
     
     @property
     def models(self) -> Dict[str, ModelInfo]:
-        return {
-            "claude-sonnet-4-20250514": ModelInfo(
-                id="claude-sonnet-4-20250514",
-                name="Claude Sonnet 4",
-                provider_id="anthropic",
-                context_limit=200000,
-                output_limit=64000,
-                supports_tools=True,
-                supports_streaming=True,
-                cost_input=3.0,
-                cost_output=15.0,
-            ),
-            "claude-opus-4-20250514": ModelInfo(
-                id="claude-opus-4-20250514",
-                name="Claude Opus 4",
-                provider_id="anthropic",
-                context_limit=200000,
-                output_limit=32000,
-                supports_tools=True,
-                supports_streaming=True,
-                cost_input=15.0,
-                cost_output=75.0,
-            ),
-            "claude-3-5-haiku-20241022": ModelInfo(
-                id="claude-3-5-haiku-20241022",
-                name="Claude 3.5 Haiku",
-                provider_id="anthropic",
-                context_limit=200000,
-                output_limit=8192,
-                supports_tools=True,
-                supports_streaming=True,
-                cost_input=0.8,
-                cost_output=4.0,
-            ),
-        }
+        return self._models
     
     def _get_client(self):
         if self._client is None:
@@ -86,13 +92,17 @@ class AnthropicProvider(BaseProvider):
         anthropic_messages = []
         for msg in messages:
             content = msg.content
-            if isinstance(content, str):
+            if isinstance(content, str) and not msg.cache_breakpoint:
                 anthropic_messages.append({"role": msg.role, "content": content})
+                continue
+            if isinstance(content, str):
+                blocks = [{"type": "text", "text": content}]
             else:
-                anthropic_messages.append({
-                    "role": msg.role,
-                    "content": [{"type": c.type, "text": c.text} for c in content if c.text]
-                })
+                blocks = [{"type": c.type, "text": c.text} for c in content if c.text]
+            if msg.cache_breakpoint and blocks:
+                # 안정 prefix 끝에 캐시 마커 - 이전 히스토리는 다음 턴에 캐시 히트
+                blocks[-1]["cache_control"] = {"type": "ephemeral"}
+            anthropic_messages.append({"role": msg.role, "content": blocks})
         
         kwargs: Dict[str, Any] = {
             "model": model_id,
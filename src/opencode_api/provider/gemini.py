@@ -12,11 +12,31 @@ GEMINI3_MODELS = {
 }
 
 
+def _build_models() -> Dict[str, ModelInfo]:
+    return {
+        "gemini-3-flash-preview": ModelInfo(
+            id="gemini-3-flash-preview",
+            name="Gemini 3.0 Flash",
+            provider_id="gemini",
+            context_limit=1048576,
+            output_limit=65536,
+            supports_tools=True,
+            supports_streaming=True,
+            cost_input=0.5,
+            cost_output=3.0,
+        ),
+    }
+
+
 class GeminiProvider(BaseProvider):
 
+    emits_fake_tool_calls = True
+
     def __init__(self, api_key: Optional[str] = None):
         self._api_key = api_key or os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
         self._client = None
+        # 모델 목록은 고정 - 접근마다 ModelInfo를 다시 만들지 않도록 한 번만 생성
+        self._models = _build_models()
 
     @property
     def id(self) -> str:
@@ -28,19 +48,7 @@ class GeminiProvider(BaseProvider):
 
     @property
     def models(self) -> Dict[str, ModelInfo]:
-        return {
-            "gemini-3-flash-preview": ModelInfo(
-                id="gemini-3-flash-preview",
-                name="Gemini 3.0 Flash",
-                provider_id="gemini",
-                context_limit=1048576,
-                output_limit=65536,
-                supports_tools=True,
-                supports_streaming=True,
-                cost_input=0.5,
-                cost_output=3.0,
-            ),
-        }
+        return self._models
 
     def _get_client(self):
         if self._client is None:
@@ -68,11 +76,13 @@ class GeminiProvider(BaseProvider):
         client = self._get_client()
 
         contents = []
-        print(f"[Gemini DEBUG] Building contents from {len(messages)} messages", flush=True)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        logger.debug("[Gemini] Building contents from %d messages", len(messages))
         for msg in messages:
             role = "user" if msg.role == "user" else "model"
             content = msg.content
-            print(f"[Gemini DEBUG] msg.role={msg.role}, content type={type(content)}, content={repr(content)[:100]}", flush=True)
+            if debug:
+                logger.debug("[Gemini] msg.role=%s, content type=%s, content=%s", msg.role, type(content), repr(content)[:100])
 
             if isinstance(content, str) and content:
                 contents.append(types.Content(
@@ -84,7 +94,7 @@ class GeminiProvider(BaseProvider):
                 if parts:
                     contents.append(types.Content(role=role, parts=parts))
 
-        print(f"[Gemini DEBUG] Built {len(contents)} contents", flush=True)
+        logger.debug("[Gemini] Built %d contents", len(contents))
 
         config_kwargs: Dict[str, Any] = {}
 
@@ -175,7 +185,7 @@ class GeminiProvider(BaseProvider):
 
             finish_reason = getattr(candidate, 'finish_reason', None)
             if finish_reason:
-                print(f"[Gemini] finish_reason: {finish_reason}, pending_tool_calls: {len(pending_tool_calls)}", flush=True)
+                logger.debug("[Gemini] finish_reason: %s, pending_tool_calls: %d", finish_reason, len(pending_tool_calls))
                 for tc in pending_tool_calls:
                     yield StreamChunk(type="tool_call", tool_call=tc)
 
@@ -185,7 +195,7 @@ class GeminiProvider(BaseProvider):
                     stop_reason = "tool_calls"
                 else:
                     stop_reason = self._map_stop_reason(finish_reason)
-                print(f"[Gemini] Mapped stop_reason: {stop_reason}", flush=True)
+                logger.debug("[Gemini] Mapped stop_reason: %s", stop_reason)
 
                 usage = None
                 if hasattr(chunk, 'usage_metadata') and chunk.usage_metadata:
@@ -166,6 +166,8 @@ DEFAULT_MODELS = {
 
 class LiteLLMProvider(BaseProvider):
     
+    emits_fake_tool_calls = True
+    
     def __init__(self):
         self._litellm = None
         self._models = dict(DEFAULT_MODELS)
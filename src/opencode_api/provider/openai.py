@@ -5,11 +5,51 @@ import json
 from .provider import BaseProvider, ModelInfo, Message, StreamChunk, ToolCall
 
 
+def _build_models() -> Dict[str, ModelInfo]:
+    return {
+        "gpt-4o": ModelInfo(
+            id="gpt-4o",
+            name="GPT-4o",
+            provider_id="openai",
+            context_limit=128000,
+            output_limit=16384,
+            supports_tools=True,
+            supports_streaming=True,
+            cost_input=2.5,
+            cost_output=10.0,
+        ),
+        "gpt-4o-mini": ModelInfo(
+            id="gpt-4o-mini",
+            name="GPT-4o Mini",
+            provider_id="openai",
+            context_limit=128000,
+            output_limit=16384,
+            supports_tools=True,
+            supports_streaming=True,
+            cost_input=0.15,
+            cost_output=0.6,
+        ),
+        "o1": ModelInfo(
+            id="o1",
+            name="o1",
+            provider_id="openai",
+            context_limit=200000,
+            output_limit=100000,
+            supports_tools=True,
+            supports_streaming=True,
+            cost_input=15.0,
+            cost_output=60.0,
+        ),
+    }
+
+
 class OpenAIProvider(BaseProvider):
     
     def __init__(self, api_key: Optional[str] = None):
         self._api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self._client = None
+        # 모델 목록은 고정 - 접근마다 ModelInfo를 다시 만들지 않도록 한 번만 생성
+        self._models = _build_models()
     
     @property
     def id(self) -> str:
@@ -21,41 +61,7 @@ class OpenAIProvider(BaseProvider):
     
     @property
     def models(self) -> Dict[str, ModelInfo]:
-        return {
-            "gpt-4o": ModelInfo(
-                id="gpt-4o",
-                name="GPT-4o",
-                provider_id="openai",
-                context_limit=128000,
-                output_limit=16384,
-                supports_tools=True,
-                supports_streaming=True,
-                cost_input=2.5,
-                cost_output=10.0,
-            ),
-            "gpt-4o-mini": ModelInfo(
-                id="gpt-4o-mini",
-                name="GPT-4o Mini",
-                provider_id="openai",
-                context_limit=128000,
-                output_limit=16384,
-                supports_tools=True,
-                supports_streaming=True,
-                cost_input=0.15,
-                cost_output=0.6,
-            ),
-            "o1": ModelInfo(
-                id="o1",
-                name="o1",
-                provider_id="openai",
-                context_limit=200000,
-                output_limit=100000,
-                supports_tools=True,
-                supports_streaming=True,
-                cost_input=15.0,
-                cost_output=60.0,
-            ),
-        }
+        return self._models
     
     def _get_client(self):
         if self._client is None:
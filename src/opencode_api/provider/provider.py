@@ -1,5 +1,5 @@
 from typing import Dict, Any, List, Optional, AsyncIterator, AsyncGenerator, Protocol, runtime_checkable
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_serializer
 from abc import ABC, abstractmethod
 
 
@@ -29,6 +29,7 @@ class MessageContent(BaseModel):
 class Message(BaseModel):
     role: str  # "user", "assistant", "system"
     content: str | List[MessageContent]
+    cache_breakpoint: bool = False  # 안정 prefix의 마지막 메시지 (프롬프트 캐시 경계)
 
 
 class ToolCall(BaseModel):
@@ -49,6 +50,15 @@ class StreamChunk(BaseModel):
     error: Optional[str] = None
     usage: Optional[Dict[str, int]] = None
     stop_reason: Optional[str] = None  # "end_turn", "tool_calls", "max_tokens", etc.
+    terminate: bool = False  # tool_result: 도구가 루프 종료를 요청
+
+    @model_serializer(mode="wrap")
+    def _drop_terminate(self, handler):
+        # terminate는 요청된 경우에만 직렬화 (기존 클라이언트 wire format 유지)
+        data = handler(self)
+        if not self.terminate:
+            data.pop("terminate", None)
+        return data
 
 
 @runtime_checkable
@@ -76,6 +86,9 @@ class Provider(Protocol):
 
 class BaseProvider(ABC):
     
+    # 텍스트로 "[Called tool: ...]"를 흉내 내는 모델을 서빙하는 provider만 True
+    emits_fake_tool_calls: bool = False
+    
     @property
     @abstractmethod
     def id(self) -> str:
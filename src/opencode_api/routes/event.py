@@ -26,7 +26,7 @@ async def subscribe_events():
             while True:
                 try:
                     event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield f"data: {json.dumps({'type': event.type, 'payload': event.payload})}\n\n"
+                    yield f"data: {event.to_json()}\n\n"
                 except asyncio.TimeoutError:
                     yield f"data: {json.dumps({'type': 'server.heartbeat', 'payload': {}})}\n\n"
         except asyncio.CancelledError:
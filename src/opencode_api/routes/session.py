@@ -40,10 +40,11 @@ class GenerateTitleRequest(BaseModel):
 @router.get("/", response_model=List[SessionInfo])
 async def list_sessions(
     limit: Optional[int] = Query(None, description="Maximum number of sessions to return"),
+    offset: int = Query(0, ge=0, description="Number of sessions to skip"),
     user: Optional[AuthUser] = Depends(optional_auth)
 ):
     user_id = user.id if user else None
-    return await Session.list(limit, user_id)
+    return await Session.list(limit, user_id, offset=offset)
 
 
 @router.post("/", response_model=SessionInfo)
@@ -1,16 +1,299 @@
 from typing import Optional, List, Dict, Any, Union, Literal
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+import asyncio
+import logging
+import sys
+import httpx
 
 from ..core.storage import Storage, NotFoundError
-from ..core.bus import Bus, MESSAGE_UPDATED, MESSAGE_REMOVED, PART_UPDATED, MessagePayload, PartPayload
+from ..core.bus import Bus, MESSAGE_UPDATED, MESSAGE_REMOVED, PART_UPDATED, SESSION_DELETED, MessagePayload, PartPayload
 from ..core.identifier import Identifier
-from ..core.supabase import get_client, is_enabled as supabase_enabled
+from ..core.clock import step_now
+from ..core.supabase import get_client, is_enabled as supabase_enabled, run_sync as _run_sync
 
+logger = logging.getLogger(__name__)
 
-class MessagePart(BaseModel):
+
+# Supabase 설정은 프로세스 수명 동안 고정 - import 시점에 한 번만 평가
+_SUPABASE_ENABLED = supabase_enabled()
+_client = None
+
+
+def _get_client_cached():
+    global _client
+    if _client is None:
+        _client = get_client()
+    return _client
+
+
+_META_FIELDS = ("usage", "error")
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """값 종류가 적은 문자열(type/status/provider 등)은 intern - 파트 수천 개가 같은 객체 공유"""
+    return sys.intern(value) if value else value
+
+
+# None 필드는 저장하지 않음 (exclude_unset은 role 기본값까지 빠지므로 사용하지 않음)
+_DUMP_KW = {"exclude_none": True}
+# 모델 변환에 실제로 쓰는 컬럼만 조회 (sql/001, 002 스키마 기준)
+_MSG_COLS = "id,session_id,role,content,created_at,provider_id,model_id,input_tokens,output_tokens,error"
+_PART_COLS = "id,type,content,tool_call_id,tool_name,tool_args,tool_output,tool_status"
+_MSG_SELECT = f"{_MSG_COLS}, opencode_message_parts({_PART_COLS})"
+
+
+def _meta_key(session_id: str, message_id: str, field: str) -> List[str]:
+    """usage/error 사이드카 키 - 본문 메시지를 다시 쓰지 않고 갱신"""
+    return ["message-meta", session_id, message_id, field]
+
+
+async def _merge_meta(session_id: str, message_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    for field in _META_FIELDS:
+        value = await Storage.read(_meta_key(session_id, message_id, field))
+        if value is not None:
+            data[field] = value
+    return data
+
+
+def _part_key(session_id: str, message_id: str, part_id: str) -> List[str]:
+    """파트 사이드카 키 - 파트 추가/수정 시 메시지 전체를 다시 쓰지 않음"""
+    return ["part", session_id, message_id, part_id]
+
+
+async def _migrate_inline_parts(session_id: str, message_id: str, msg_data: Dict[str, Any]) -> Dict[str, Any]:
+    """레거시 레코드(parts 인라인 리스트)를 파트 사이드카 레이아웃으로 1회 변환"""
+    parts = msg_data.pop("parts", None)
+    if not parts:
+        return msg_data
+    for p in parts:
+        await Storage.write(_part_key(session_id, message_id, p["id"]), {k: v for k, v in p.items() if v is not None})
+    # 레거시 파트 ID는 단조 증가가 보장되지 않으므로 원래 순서를 보관
+    msg_data["part_order"] = [p["id"] for p in parts]
+    await Storage.write(["message", session_id, message_id], msg_data)
+    return msg_data
+
+
+async def _read_raw_message(session_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+    msg_data = await Storage.read(["message", session_id, message_id])
+    if msg_data and msg_data.get("parts"):
+        msg_data = await _migrate_inline_parts(session_id, message_id, msg_data)
+    return msg_data
+
+
+async def _load_parts(session_id: str, message_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    part_keys = await Storage.list(["part", session_id, message_id])
+    part_ids = {k[-1] for k in part_keys}
+    order = [pid for pid in data.get("part_order", ()) if pid in part_ids]
+    # 파트 ID는 단조 증가 ULID - part_order 이후 추가분은 ID순
+    order.extend(sorted(part_ids.difference(order)))
+    parts = []
+    for part_id in order:
+        part_data = await Storage.read(_part_key(session_id, message_id, part_id))
+        if part_data:
+            parts.append(part_data)
+    data["parts"] = parts
+    return data
+
+
+async def _remove_parts(session_id: str, message_id: str) -> None:
+    for key in await Storage.list(["part", session_id, message_id]):
+        await Storage.remove(key)
+
+
+def _part_row(part: "MessagePart") -> Dict[str, Any]:
+    """MessagePart -> opencode_message_parts 행"""
+    return {
+        "id": part.id,
+        "message_id": part.message_id,
+        "type": part.type,
+        "content": part.content,
+        "tool_call_id": part.tool_call_id,
+        "tool_name": part.tool_name,
+        "tool_args": part.tool_args,
+        "tool_output": part.tool_output,
+        "tool_status": part.tool_status,
+    }
+
+
+async def _store_parts(session_id: str, message_id: str, parts: List["MessagePart"]) -> None:
+    msg_data = await _read_raw_message(session_id, message_id)
+    if not msg_data:
+        raise NotFoundError(["message", session_id, message_id])
+    
+    for part in parts:
+        await Storage.write(_part_key(session_id, message_id, part.id), part.to_dict(exclude_none=True))
+
+
+# 재시도할 Postgres 오류 클래스: 08 연결, 40 직렬화/교착, 53 자원 부족, 57 운영자 개입
+_TRANSIENT_PG_CLASSES = frozenset({"08", "40", "53", "57"})
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """네트워크/일시적 DB 오류만 True - FK/제약 위반 등은 재시도해도 실패"""
+    if isinstance(exc, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, str) and code[:2] in _TRANSIENT_PG_CLASSES
+
+
+class _PartWriter:
+    """Supabase 파트 insert 배치 처리
+
+    add_part는 행을 pending에 넣기만 하고, 64개가 쌓이거나 50ms가 지나면
+    한 번의 bulk insert로 기록한다. 아직 insert 전인 파트의 update는 pending
+    행에 병합되고, 읽기/삭제 전에는 flush(session_id)로 해당 세션 행을 먼저 비운다.
+
+    일시적 오류 행은 MAX_ATTEMPTS까지 재시도하고, 영구 오류(FK 위반 등)는
+    행 단위로 다시 넣어 원인 행만 로그와 함께 버린다. 한 행 때문에 배치
+    전체나 무관한 읽기가 막히지 않도록 flush는 예외를 전파하지 않는다.
+    """
+    BATCH_SIZE = 64
+    FLUSH_INTERVAL = 0.05
+    MAX_RETRY_DELAY = 5.0
+    MAX_ATTEMPTS = 5
+
+    def __init__(self):
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Dict[str, str] = {}  # part_id -> session_id
+        self._attempts: Dict[str, int] = {}  # part_id -> 일시적 오류로 실패한 횟수
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def pending(self, part_id: str) -> Optional[Dict[str, Any]]:
+        return self._pending.get(part_id)
+
+    async def settled(self) -> None:
+        """진행 중인 bulk insert가 끝날 때까지 대기"""
+        if self._lock is not None and self._lock.locked():
+            async with self._lock:
+                pass
+
+    def stage(self, row: Dict[str, Any], session_id: str) -> None:
+        """행을 pending에 추가만 함 (flush는 호출자가)"""
+        self._pending[row["id"]] = row
+        self._sessions[row["id"]] = session_id
+
+    async def enqueue(self, row: Dict[str, Any], session_id: str) -> None:
+        self.stage(row, session_id)
+        if len(self._pending) >= self.BATCH_SIZE:
+            await self.flush()
+        if self._pending and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def discard_session(self, session_id: str) -> None:
+        """세션 삭제 전 호출 - 아직 insert 안 된 해당 세션 행을 버리고 진행 중 insert 대기"""
+        for part_id in [pid for pid, sid in self._sessions.items() if sid == session_id]:
+            self._forget(part_id)
+        await self.settled()
+
+    async def _run(self) -> None:
+        delay = self.FLUSH_INTERVAL
+        while self._pending:
+            await asyncio.sleep(delay)
+            if await self.flush():
+                delay = min(delay * 2, self.MAX_RETRY_DELAY)
+            else:
+                delay = self.FLUSH_INTERVAL
+
+    async def flush(self, session_id: Optional[str] = None) -> bool:
+        """pending 행을 bulk insert (session_id가 있으면 그 세션 행만)
+
+        Returns:
+            True if some rows failed transiently and were put back for retry
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if session_id is None:
+                part_ids = list(self._pending)
+            else:
+                part_ids = [pid for pid in self._pending if self._sessions.get(pid) == session_id]
+            if not part_ids:
+                return False
+            rows = [self._pending.pop(pid) for pid in part_ids]
+            try:
+                retry = await self._insert(rows)
+            except BaseException:
+                # 취소 등 - 모두 되돌리고 전파
+                self._requeue(rows)
+                raise
+            retry_ids = {row["id"] for row in retry}
+            for row in rows:
+                if row["id"] not in retry_ids:
+                    self._sessions.pop(row["id"], None)
+                    self._attempts.pop(row["id"], None)
+            kept = []
+            for row in retry:
+                if row["id"] not in self._sessions:
+                    continue  # insert 중 세션이 삭제됨
+                attempts = self._attempts.get(row["id"], 0) + 1
+                if attempts >= self.MAX_ATTEMPTS:
+                    logger.error("Dropping message part %s after %d failed inserts", row["id"], attempts)
+                    self._forget(row["id"])
+                else:
+                    self._attempts[row["id"]] = attempts
+                    kept.append(row)
+            self._requeue(kept)
+            return bool(kept)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """rows insert - 일시적 오류로 실패한 행 목록 반환 (영구 오류 행은 버림)"""
+        try:
+            await _run_sync(_get_client_cached().table("opencode_message_parts").insert(rows).execute)
+            return []
+        except Exception as e:
+            if _is_transient(e):
+                logger.warning("Transient error inserting %d message parts: %s", len(rows), e)
+                return rows
+            if len(rows) == 1:
+                logger.error("Dropping message part %s (message %s): %s", rows[0]["id"], rows[0].get("message_id"), e)
+                self._forget(rows[0]["id"])
+                return []
+        # 영구 오류 - 배치 중 원인 행만 골라내기 위해 행 단위로 다시 시도
+        retry: List[Dict[str, Any]] = []
+        for row in rows:
+            retry.extend(await self._insert([row]))
+        return retry
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        # flush 도중 들어온 행보다 앞에 두어 순서 유지 (그 사이 discard된 행은 제외)
+        restored = {row["id"]: row for row in rows if row["id"] in self._sessions}
+        restored.update(self._pending)
+        self._pending = restored
+
+    def _forget(self, part_id: str) -> None:
+        self._pending.pop(part_id, None)
+        self._sessions.pop(part_id, None)
+        self._attempts.pop(part_id, None)
+
+
+_part_writer = _PartWriter()
+
+
+async def flush_parts() -> None:
+    """대기 중인 Supabase 파트 insert 반영 (앱 종료 시 호출)"""
+    await _part_writer.flush()
+
+
+async def discard_pending_parts(session_id: str) -> None:
+    """세션 삭제 시 아직 insert 안 된 파트 행 폐기"""
+    await _part_writer.discard_session(session_id)
+
+
+def _as_utc(v: datetime) -> datetime:
+    # 기존 저장 데이터의 naive datetime은 UTC로 간주
+    return v if v.tzinfo else v.replace(tzinfo=timezone.utc)
+
+
+@dataclass(slots=True)
+class MessagePart:
     """메시지 파트 모델
 
+    스트리밍 중 대량 생성되는 내부 데이터라 pydantic 대신 slots dataclass 사용.
+
     type 종류:
     - "text": 일반 텍스트 응답
     - "reasoning": Claude의 thinking/extended thinking
@@ -28,6 +311,24 @@ class MessagePart(BaseModel):
     tool_output: Optional[str] = None
     tool_status: Optional[str] = None  # "pending", "running", "completed", "error"
 
+    def __post_init__(self) -> None:
+        self.type = _intern(self.type)
+        self.tool_name = _intern(self.tool_name)
+        self.tool_status = _intern(self.tool_status)
+
+    def to_dict(self, exclude_none: bool = False) -> Dict[str, Any]:
+        data = asdict(self)
+        if exclude_none:
+            return {k: v for k, v in data.items() if v is not None}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MessagePart":
+        return cls(**{k: v for k, v in data.items() if k in _PART_FIELDS})
+
+
+_PART_FIELDS = frozenset(f.name for f in fields(MessagePart))
+
 
 class MessageInfo(BaseModel):
     id: str
@@ -39,6 +340,11 @@ class MessageInfo(BaseModel):
     usage: Optional[Dict[str, int]] = None
     error: Optional[str] = None
 
+    @field_validator("created_at")
+    @classmethod
+    def _assume_utc(cls, v: datetime) -> datetime:
+        return _as_utc(v)
+
 
 class UserMessage(MessageInfo):
     role: Literal["user"] = "user"
@@ -50,13 +356,151 @@ class AssistantMessage(MessageInfo):
     parts: List[MessagePart] = Field(default_factory=list)
     summary: bool = False
 
+    def make_part(self, type: str, **fields: Any) -> MessagePart:
+        """이 메시지에 속한 새 파트 생성 (id는 add_part에서 발급)"""
+        return MessagePart(id="", session_id=self.session_id, message_id=self.id, type=type, **fields)
+
+
+_parse_datetime = TypeAdapter(datetime).validate_python
+
+
+def _part_from_row(p: Dict[str, Any], session_id: str, message_id: str) -> MessagePart:
+    """신뢰할 수 있는 DB 행 -> MessagePart (검증 생략)"""
+    g = p.get
+    return MessagePart(
+        id=p["id"],
+        session_id=session_id,
+        message_id=message_id,
+        type=p["type"],
+        content=g("content"),
+        tool_call_id=g("tool_call_id"),
+        tool_name=g("tool_name"),
+        tool_args=g("tool_args"),
+        tool_output=g("tool_output"),
+        tool_status=g("tool_status"),
+    )
+
+
+def _message_from_row(data: Dict[str, Any], session_id: str) -> Union[UserMessage, AssistantMessage]:
+    """opencode_messages 행 (+ 조인된 파트) -> 메시지 모델 (검증 생략)"""
+    # created_at만 문자열 -> aware datetime 변환
+    created_at = _as_utc(_parse_datetime(data["created_at"]))
+    if data.get("role") == "user":
+        return UserMessage.model_construct(
+            id=data["id"],
+            session_id=data["session_id"],
+            role="user",
+            content=data.get("content") or "",
+            created_at=created_at,
+        )
+    
+    part_rows = data.get("opencode_message_parts") or []
+    message_id = data["id"]
+    return AssistantMessage.model_construct(
+        id=message_id,
+        session_id=data["session_id"],
+        role="assistant",
+        created_at=created_at,
+        provider_id=_intern(data.get("provider_id")),
+        model=_intern(data.get("model_id")),
+        usage={"input_tokens": data.get("input_tokens", 0), "output_tokens": data.get("output_tokens", 0)} if data.get("input_tokens") else None,
+        error=data.get("error"),
+        parts=[_part_from_row(p, session_id, message_id) for p in part_rows],
+    )
+
+
+def _message_from_record(data: Dict[str, Any]) -> Union[UserMessage, AssistantMessage]:
+    """Storage 레코드 -> 메시지 모델 (직접 쓴 데이터이므로 검증 생략)"""
+    record = dict(data)
+    record["created_at"] = _as_utc(_parse_datetime(data["created_at"]))
+    if data.get("role") == "user":
+        return UserMessage.model_construct(**record)
+    record["parts"] = [MessagePart.from_dict(p) for p in data.get("parts") or []]
+    return AssistantMessage.model_construct(**record)
+
+
+async def _read_message(session_id: str, message_id: str) -> Optional[Union[UserMessage, AssistantMessage]]:
+    data = await _read_raw_message(session_id, message_id)
+    if not data:
+        return None
+    data = await _merge_meta(session_id, message_id, dict(data))
+    if data.get("role") != "user":
+        data = await _load_parts(session_id, message_id, data)
+    return _message_from_record(data)
+
+
+class _MessageCache:
+    """Message.get / Message.list 결과 LRU 캐시
+
+    모든 쓰기 경로에서 직접 무효화하고, Bus 이벤트(MESSAGE_*/PART_UPDATED/
+    SESSION_DELETED)로도 무효화한다. 읽는 도중 쓰기가 끼어들면 (세대 번호
+    변경) 읽은 결과는 캐시에 넣지 않는다.
+    """
+    MAX_MESSAGES = 1024
+    MAX_LISTS = 256
+
+    def __init__(self):
+        self._messages: "OrderedDict[tuple, Union[UserMessage, AssistantMessage]]" = OrderedDict()
+        self._lists: "OrderedDict[tuple, List[Union[UserMessage, AssistantMessage]]]" = OrderedDict()
+        self.generation = 0
+
+    @staticmethod
+    def _lookup(cache: OrderedDict, key: tuple):
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _store(cache: OrderedDict, key: tuple, value, max_size: int) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+
+    def get_message(self, session_id: str, message_id: str):
+        return self._lookup(self._messages, (session_id, message_id))
+
+    def put_message(self, session_id: str, message_id: str, msg, generation: int) -> None:
+        if generation == self.generation:
+            self._store(self._messages, (session_id, message_id), msg, self.MAX_MESSAGES)
+
+    def get_list(self, session_id: str, limit: Optional[int]):
+        return self._lookup(self._lists, (session_id, limit))
+
+    def put_list(self, session_id: str, limit: Optional[int], messages: list, generation: int) -> None:
+        if generation == self.generation:
+            self._store(self._lists, (session_id, limit), messages, self.MAX_LISTS)
+
+    def invalidate(self, session_id: str, message_id: Optional[str] = None) -> None:
+        self.generation += 1
+        if message_id is None:
+            for key in [k for k in self._messages if k[0] == session_id]:
+                del self._messages[key]
+        else:
+            self._messages.pop((session_id, message_id), None)
+        for key in [k for k in self._lists if k[0] == session_id]:
+            del self._lists[key]
+
+    def on_event(self, event) -> None:
+        payload = event.payload
+        if event.type == SESSION_DELETED.type:
+            self.invalidate(payload["id"])
+        else:
+            self.invalidate(payload["session_id"], payload.get("message_id"))
+
+
+_cache = _MessageCache()
+for _event in (MESSAGE_UPDATED, MESSAGE_REMOVED, PART_UPDATED, SESSION_DELETED):
+    Bus.subscribe(_event.type, _cache.on_event)
+
 
 class Message:
     
     @staticmethod
     async def create_user(session_id: str, content: str, user_id: Optional[str] = None) -> UserMessage:
         message_id = Identifier.generate("message")
-        now = datetime.utcnow()
+        now = step_now()
         
         msg = UserMessage(
             id=message_id,
@@ -65,16 +509,17 @@ class Message:
             created_at=now,
         )
         
-        if supabase_enabled() and user_id:
-            client = get_client()
-            client.table("opencode_messages").insert({
+        if _SUPABASE_ENABLED and user_id:
+            client = _get_client_cached()
+            await _run_sync(client.table("opencode_messages").insert({
                 "id": message_id,
                 "session_id": session_id,
                 "role": "user",
                 "content": content,
-            }).execute()
+                "created_at": now.isoformat(),
+            }).execute)
         else:
-            await Storage.write(["message", session_id, message_id], msg.model_dump())
+            await Storage.write(["message", session_id, message_id], msg.model_dump(**_DUMP_KW))
         
         await Bus.publish(MESSAGE_UPDATED, MessagePayload(session_id=session_id, message_id=message_id))
         return msg
@@ -88,7 +533,7 @@ class Message:
         summary: bool = False
     ) -> AssistantMessage:
         message_id = Identifier.generate("message")
-        now = datetime.utcnow()
+        now = step_now()
         
         msg = AssistantMessage(
             id=message_id,
@@ -100,73 +545,47 @@ class Message:
             summary=summary,
         )
         
-        if supabase_enabled() and user_id:
-            client = get_client()
-            client.table("opencode_messages").insert({
+        if _SUPABASE_ENABLED and user_id:
+            client = _get_client_cached()
+            await _run_sync(client.table("opencode_messages").insert({
                 "id": message_id,
                 "session_id": session_id,
                 "role": "assistant",
                 "provider_id": provider_id,
                 "model_id": model,
-            }).execute()
+                "created_at": now.isoformat(),
+            }).execute)
         else:
-            await Storage.write(["message", session_id, message_id], msg.model_dump())
+            await Storage.write(["message", session_id, message_id], msg.model_dump(exclude={"parts"}, **_DUMP_KW))
         
         await Bus.publish(MESSAGE_UPDATED, MessagePayload(session_id=session_id, message_id=message_id))
         return msg
     
     @staticmethod
     async def get(session_id: str, message_id: str, user_id: Optional[str] = None) -> Union[UserMessage, AssistantMessage]:
-        if supabase_enabled() and user_id:
-            client = get_client()
-            result = client.table("opencode_messages").select("*, opencode_message_parts(*)").eq("id", message_id).eq("session_id", session_id).single().execute()
+        msg = _cache.get_message(session_id, message_id)
+        if msg is not None:
+            return msg
+        generation = _cache.generation
+        msg = await Message._fetch(session_id, message_id, user_id)
+        _cache.put_message(session_id, message_id, msg, generation)
+        return msg
+    
+    @staticmethod
+    async def _fetch(session_id: str, message_id: str, user_id: Optional[str] = None) -> Union[UserMessage, AssistantMessage]:
+        if _SUPABASE_ENABLED and user_id:
+            await _part_writer.flush(session_id)
+            client = _get_client_cached()
+            result = await _run_sync(client.table("opencode_messages").select(_MSG_SELECT).eq("id", message_id).eq("session_id", session_id).single().execute)
             if not result.data:
                 raise NotFoundError(["message", session_id, message_id])
             
-            data = result.data
-            if data.get("role") == "user":
-                return UserMessage(
-                    id=data["id"],
-                    session_id=data["session_id"],
-                    role="user",
-                    content=data.get("content", ""),
-                    created_at=data["created_at"],
-                )
-            
-            parts = [
-                MessagePart(
-                    id=p["id"],
-                    session_id=session_id,
-                    message_id=message_id,
-                    type=p["type"],
-                    content=p.get("content"),
-                    tool_call_id=p.get("tool_call_id"),
-                    tool_name=p.get("tool_name"),
-                    tool_args=p.get("tool_args"),
-                    tool_output=p.get("tool_output"),
-                    tool_status=p.get("tool_status"),
-                )
-                for p in data.get("opencode_message_parts", [])
-            ]
-            return AssistantMessage(
-                id=data["id"],
-                session_id=data["session_id"],
-                role="assistant",
-                created_at=data["created_at"],
-                provider_id=data.get("provider_id"),
-                model=data.get("model_id"),
-                usage={"input_tokens": data.get("input_tokens", 0), "output_tokens": data.get("output_tokens", 0)} if data.get("input_tokens") else None,
-                error=data.get("error"),
-                parts=parts,
-            )
+            return _message_from_row(result.data, session_id)
         
-        data = await Storage.read(["message", session_id, message_id])
-        if not data:
+        msg = await _read_message(session_id, message_id)
+        if msg is None:
             raise NotFoundError(["message", session_id, message_id])
-        
-        if data.get("role") == "user":
-            return UserMessage(**data)
-        return AssistantMessage(**data)
+        return msg
     
     @staticmethod
     async def add_part(message_id: str, session_id: str, part: MessagePart, user_id: Optional[str] = None) -> MessagePart:
@@ -174,28 +593,10 @@ class Message:
         part.message_id = message_id
         part.session_id = session_id
         
-        if supabase_enabled() and user_id:
-            client = get_client()
-            client.table("opencode_message_parts").insert({
-                "id": part.id,
-                "message_id": message_id,
-                "type": part.type,
-                "content": part.content,
-                "tool_call_id": part.tool_call_id,
-                "tool_name": part.tool_name,
-                "tool_args": part.tool_args,
-                "tool_output": part.tool_output,
-                "tool_status": part.tool_status,
-            }).execute()
+        if _SUPABASE_ENABLED and user_id:
+            await _part_writer.enqueue(_part_row(part), session_id)
         else:
-            msg_data = await Storage.read(["message", session_id, message_id])
-            if not msg_data:
-                raise NotFoundError(["message", session_id, message_id])
-            
-            if "parts" not in msg_data:
-                msg_data["parts"] = []
-            msg_data["parts"].append(part.model_dump())
-            await Storage.write(["message", session_id, message_id], msg_data)
+            await _store_parts(session_id, message_id, [part])
         
         await Bus.publish(PART_UPDATED, PartPayload(
             session_id=session_id,
@@ -204,145 +605,157 @@ class Message:
         ))
         return part
     
+    @staticmethod
+    async def add_parts(message_id: str, session_id: str, parts: List[MessagePart], user_id: Optional[str] = None) -> List[MessagePart]:
+        """여러 파트를 한 번에 추가 (Supabase는 insert 1회, Storage는 메시지 쓰기 1회)"""
+        if not parts:
+            return parts
+        for part in parts:
+            part.id = Identifier.generate("part")
+            part.message_id = message_id
+            part.session_id = session_id
+        
+        if _SUPABASE_ENABLED and user_id:
+            # 배치 writer를 거쳐 먼저 대기 중인 같은 세션 파트와 함께 insert 1회 (순서 유지)
+            for part in parts:
+                _part_writer.stage(_part_row(part), session_id)
+            await _part_writer.flush(session_id)
+        else:
+            await _store_parts(session_id, message_id, parts)
+        
+        await asyncio.gather(*(
+            Bus.publish(PART_UPDATED, PartPayload(
+                session_id=session_id,
+                message_id=message_id,
+                part_id=part.id
+            ))
+            for part in parts
+        ))
+        return parts
+    
     @staticmethod
     async def update_part(session_id: str, message_id: str, part_id: str, updates: Dict[str, Any], user_id: Optional[str] = None) -> MessagePart:
-        if supabase_enabled() and user_id:
-            client = get_client()
-            result = client.table("opencode_message_parts").update(updates).eq("id", part_id).execute()
-            if result.data:
-                p = result.data[0]
+        if _SUPABASE_ENABLED and user_id:
+            pending = _part_writer.pending(part_id)
+            if pending is None:
+                await _part_writer.settled()
+                # insert 실패로 pending에 되돌려졌을 수 있음
+                pending = _part_writer.pending(part_id)
+            if pending is not None:
+                # 아직 insert 전 - pending 행에 병합
+                pending.update(updates)
+                p = pending
+            else:
+                client = _get_client_cached()
+                result = await _run_sync(client.table("opencode_message_parts").update(updates).eq("id", part_id).execute)
+                p = result.data[0] if result.data else None
+            if p:
                 await Bus.publish(PART_UPDATED, PartPayload(
                     session_id=session_id,
                     message_id=message_id,
                     part_id=part_id
                 ))
-                return MessagePart(
-                    id=p["id"],
-                    session_id=session_id,
-                    message_id=message_id,
-                    type=p["type"],
-                    content=p.get("content"),
-                    tool_call_id=p.get("tool_call_id"),
-                    tool_name=p.get("tool_name"),
-                    tool_args=p.get("tool_args"),
-                    tool_output=p.get("tool_output"),
-                    tool_status=p.get("tool_status"),
-                )
+                return _part_from_row(p, session_id, message_id)
             raise NotFoundError(["part", message_id, part_id])
         
-        msg_data = await Storage.read(["message", session_id, message_id])
+        msg_data = await _read_raw_message(session_id, message_id)
         if not msg_data:
             raise NotFoundError(["message", session_id, message_id])
         
-        for i, p in enumerate(msg_data.get("parts", [])):
-            if p.get("id") == part_id:
-                msg_data["parts"][i].update(updates)
-                await Storage.write(["message", session_id, message_id], msg_data)
-                await Bus.publish(PART_UPDATED, PartPayload(
-                    session_id=session_id,
-                    message_id=message_id,
-                    part_id=part_id
-                ))
-                return MessagePart(**msg_data["parts"][i])
+        part_key = _part_key(session_id, message_id, part_id)
+        part_data = await Storage.read(part_key)
+        if part_data is not None:
+            part_data.update(updates)
+            await Storage.write(part_key, part_data)
+            await Bus.publish(PART_UPDATED, PartPayload(
+                session_id=session_id,
+                message_id=message_id,
+                part_id=part_id
+            ))
+            return MessagePart.from_dict(part_data)
         
         raise NotFoundError(["part", message_id, part_id])
     
     @staticmethod
     async def list(session_id: str, limit: Optional[int] = None, user_id: Optional[str] = None) -> List[Union[UserMessage, AssistantMessage]]:
-        if supabase_enabled() and user_id:
-            client = get_client()
-            query = client.table("opencode_messages").select("*, opencode_message_parts(*)").eq("session_id", session_id).order("created_at")
+        messages = _cache.get_list(session_id, limit)
+        if messages is not None:
+            return list(messages)
+        generation = _cache.generation
+        messages = await Message._fetch_list(session_id, limit, user_id)
+        _cache.put_list(session_id, limit, messages, generation)
+        return list(messages)
+    
+    @staticmethod
+    async def _fetch_list(session_id: str, limit: Optional[int] = None, user_id: Optional[str] = None) -> List[Union[UserMessage, AssistantMessage]]:
+        if _SUPABASE_ENABLED and user_id:
+            await _part_writer.flush(session_id)
+            client = _get_client_cached()
+            query = client.table("opencode_messages").select(_MSG_SELECT).eq("session_id", session_id).order("created_at").order("id")
             if limit:
                 query = query.limit(limit)
-            result = query.execute()
+            result = await _run_sync(query.execute)
             
-            messages = []
-            for data in result.data:
-                if data.get("role") == "user":
-                    messages.append(UserMessage(
-                        id=data["id"],
-                        session_id=data["session_id"],
-                        role="user",
-                        content=data.get("content", ""),
-                        created_at=data["created_at"],
-                    ))
-                else:
-                    parts = [
-                        MessagePart(
-                            id=p["id"],
-                            session_id=session_id,
-                            message_id=data["id"],
-                            type=p["type"],
-                            content=p.get("content"),
-                            tool_call_id=p.get("tool_call_id"),
-                            tool_name=p.get("tool_name"),
-                            tool_args=p.get("tool_args"),
-                            tool_output=p.get("tool_output"),
-                            tool_status=p.get("tool_status"),
-                        )
-                        for p in data.get("opencode_message_parts", [])
-                    ]
-                    messages.append(AssistantMessage(
-                        id=data["id"],
-                        session_id=data["session_id"],
-                        role="assistant",
-                        created_at=data["created_at"],
-                        provider_id=data.get("provider_id"),
-                        model=data.get("model_id"),
-                        usage={"input_tokens": data.get("input_tokens", 0), "output_tokens": data.get("output_tokens", 0)} if data.get("input_tokens") else None,
-                        error=data.get("error"),
-                        parts=parts,
-                    ))
-            return messages
+            return [_message_from_row(data, session_id) for data in result.data]
         
         message_keys = await Storage.list(["message", session_id])
-        messages = []
+        # 메시지 ID는 시간순 ULID - 키 정렬 후 limit 적용
+        message_keys.sort(key=lambda k: k[-1])
+        if limit:
+            message_keys = message_keys[:limit]
         
-        for key in message_keys:
-            if limit and len(messages) >= limit:
-                break
-            data = await Storage.read(key)
-            if data:
-                if data.get("role") == "user":
-                    messages.append(UserMessage(**data))
-                else:
-                    messages.append(AssistantMessage(**data))
+        # 키 순서가 곧 생성 순서이므로 결과를 다시 정렬하지 않음
+        results = await asyncio.gather(*(_read_message(session_id, key[-1]) for key in message_keys))
+        return [m for m in results if m is not None]
+    
+    @staticmethod
+    async def list_since(session_id: str, after_id: str, user_id: Optional[str] = None) -> List[Union[UserMessage, AssistantMessage]]:
+        """after_id보다 뒤에 생성된 메시지만 id 순으로 조회 (캐시 미사용)"""
+        if _SUPABASE_ENABLED and user_id:
+            await _part_writer.flush(session_id)
+            client = _get_client_cached()
+            query = client.table("opencode_messages").select(_MSG_SELECT).eq("session_id", session_id).gt("id", after_id).order("id")
+            result = await _run_sync(query.execute)
+            return [_message_from_row(data, session_id) for data in result.data]
         
-        messages.sort(key=lambda m: m.created_at)
-        return messages
+        message_keys = await Storage.list(["message", session_id])
+        message_ids = sorted(key[-1] for key in message_keys if key[-1] > after_id)
+        results = await asyncio.gather(*(_read_message(session_id, message_id) for message_id in message_ids))
+        return [m for m in results if m is not None]
     
     @staticmethod
     async def delete(session_id: str, message_id: str, user_id: Optional[str] = None) -> bool:
-        if supabase_enabled() and user_id:
-            client = get_client()
-            client.table("opencode_messages").delete().eq("id", message_id).execute()
+        if _SUPABASE_ENABLED and user_id:
+            await _part_writer.flush(session_id)
+            client = _get_client_cached()
+            await _run_sync(client.table("opencode_messages").delete().eq("id", message_id).execute)
         else:
             await Storage.remove(["message", session_id, message_id])
+            await _remove_parts(session_id, message_id)
+            for field in _META_FIELDS:
+                await Storage.remove(_meta_key(session_id, message_id, field))
         
         await Bus.publish(MESSAGE_REMOVED, MessagePayload(session_id=session_id, message_id=message_id))
         return True
     
     @staticmethod
     async def set_usage(session_id: str, message_id: str, usage: Dict[str, int], user_id: Optional[str] = None) -> None:
-        if supabase_enabled() and user_id:
-            client = get_client()
-            client.table("opencode_messages").update({
+        if _SUPABASE_ENABLED and user_id:
+            client = _get_client_cached()
+            await _run_sync(client.table("opencode_messages").update({
                 "input_tokens": usage.get("input_tokens", 0),
                 "output_tokens": usage.get("output_tokens", 0),
-            }).eq("id", message_id).execute()
+            }).eq("id", message_id).execute)
         else:
-            msg_data = await Storage.read(["message", session_id, message_id])
-            if msg_data:
-                msg_data["usage"] = usage
-                await Storage.write(["message", session_id, message_id], msg_data)
+            await Storage.write(_meta_key(session_id, message_id, "usage"), usage)
+        # 이벤트를 발행하지 않는 경로라 캐시를 직접 무효화
+        _cache.invalidate(session_id, message_id)
     
     @staticmethod
     async def set_error(session_id: str, message_id: str, error: str, user_id: Optional[str] = None) -> None:
-        if supabase_enabled() and user_id:
-            client = get_client()
-            client.table("opencode_messages").update({"error": error}).eq("id", message_id).execute()
+        if _SUPABASE_ENABLED and user_id:
+            client = _get_client_cached()
+            await _run_sync(client.table("opencode_messages").update({"error": error}).eq("id", message_id).execute)
         else:
-            msg_data = await Storage.read(["message", session_id, message_id])
-            if msg_data:
-                msg_data["error"] = error
-                await Storage.write(["message", session_id, message_id], msg_data)
+            await Storage.write(_meta_key(session_id, message_id, "error"), error)
+        _cache.invalidate(session_id, message_id)
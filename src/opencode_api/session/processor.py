@@ -2,12 +2,28 @@
 Session processor for managing agentic loop execution.
 """
 
-from typing import Optional, Dict, Any, AsyncIterator, List
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, AsyncIterator, List, NamedTuple, Tuple
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from functools import lru_cache
 import asyncio
+import hashlib
+import json
+import random
+import time
 
-from ..provider.provider import StreamChunk
+from ..provider.provider import Message as ProviderMessage, StreamChunk
+from ..core.clock import set_step_now, utc_now
+
+
+def _freeze(value: Any) -> Any:
+    """인자를 해시 가능한 구조로 변환 (dict -> frozenset, list -> tuple)"""
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
 
 
 class DoomLoopDetector:
@@ -19,7 +35,10 @@ class DoomLoopDetector:
 
     def __init__(self, threshold: int = 3):
         self.threshold = threshold
-        self.history: List[tuple[str, str]] = []  # (tool_name, args_hash)
+        # 직전 호출 키와 연속 횟수만 유지 - 호출당 비교 1회 + 증가 1회
+        self._last_key: Optional[tuple] = None  # (tool_name, frozen_args)
+        self._streak = 0
+        self._doom_cached = False  # 마지막 record() 판정 결과
 
     def record(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> bool:
         """도구 호출을 기록하고 doom loop 감지 시 True 반환
@@ -31,44 +50,70 @@ class DoomLoopDetector:
         Returns:
             True if doom loop detected, False otherwise
         """
-        import json
-        import hashlib
-
-        # 인자를 정규화하여 해시 생성 (원본처럼 JSON 비교)
         args_dict = args or {}
-        args_str = json.dumps(args_dict, sort_keys=True, default=str)
-        args_hash = hashlib.md5(args_str.encode()).hexdigest()[:8]
-
-        call_signature = (tool_name, args_hash)
-        self.history.append(call_signature)
-
-        # 최근 threshold개가 모두 같은 (도구 + 인자)인지 확인
-        if len(self.history) >= self.threshold:
-            recent = self.history[-self.threshold:]
-            if len(set(recent)) == 1:  # 튜플 비교 (도구+인자)
-                return True
-
-        return False
+        try:
+            # 구조적 튜플 키 - JSON 직렬화/해시 없이 비교
+            call_signature = (tool_name, _freeze(args_dict))
+            hash(call_signature)
+        except TypeError:
+            # 해시 불가능한 값이 섞인 경우 기존처럼 JSON 해시로 비교
+            args_str = json.dumps(args_dict, sort_keys=True, default=str)
+            call_signature = (tool_name, hashlib.md5(args_str.encode()).hexdigest()[:8])
+        if call_signature == self._last_key:
+            self._streak += 1
+        else:
+            self._last_key = call_signature
+            self._streak = 1
+
+        # 같은 (도구 + 인자)가 threshold번 연속이면 doom loop
+        self._doom_cached = self._streak >= self.threshold
+        return self._doom_cached
+
+    @property
+    def is_looping(self) -> bool:
+        """마지막 record() 기준 doom loop 여부"""
+        return self._doom_cached
 
     def reset(self):
-        self.history = []
+        self._last_key = None
+        self._streak = 0
+        self._doom_cached = False
 
 
-class RetryConfig(BaseModel):
-    """재시도 설정"""
+class RetryConfig(NamedTuple):
+    """재시도 설정 (불변)"""
     max_retries: int = 3
     base_delay: float = 1.0  # seconds
     max_delay: float = 30.0
     exponential_base: float = 2.0
 
 
-class StepInfo(BaseModel):
+_DEFAULT_RETRY = RetryConfig()
+# 일시적 오류만 재시도 - 인증/스키마 오류 등은 즉시 전파
+_RETRYABLE: Tuple[type, ...] = (TimeoutError, asyncio.TimeoutError, ConnectionError)
+
+
+@lru_cache(maxsize=8)
+def _delay_table(config: RetryConfig) -> Tuple[float, ...]:
+    """attempt별 backoff 딜레이를 미리 계산"""
+    return tuple(
+        min(config.max_delay, config.base_delay * config.exponential_base ** i)
+        for i in range(config.max_retries)
+    )
+
+
+@dataclass(slots=True)
+class StepInfo:
     """스텝 정보"""
     step: int
     started_at: datetime
     finished_at: Optional[datetime] = None
-    tool_calls: List[str] = []
+    tool_calls: List[str] = field(default_factory=list)
     status: str = "running"  # running, completed, error, doom_loop
+    duration: Optional[float] = None  # finish_step 시점에 한 번만 계산
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
 
 
 class SessionProcessor:
@@ -81,44 +126,97 @@ class SessionProcessor:
     - 스텝 추적 (step-start, step-finish 이벤트)
     """
 
-    _processors: Dict[str, "SessionProcessor"] = {}
+    # 접근 순서(LRU) 유지 - 오래 사용되지 않은 프로세서는 get_or_create 시 정리
+    _processors: "OrderedDict[str, SessionProcessor]" = OrderedDict()
+    MAX_PROCESSORS = 10_000
+    PROCESSOR_TTL = 3600.0  # seconds since last access
 
     def __init__(self, session_id: str, max_steps: int = 50, doom_threshold: int = 3):
         self.session_id = session_id
         self.max_steps = max_steps
         self.doom_detector = DoomLoopDetector(threshold=doom_threshold)
-        self.retry_config = RetryConfig()
+        self.retry_config = _DEFAULT_RETRY
         self.steps: List[StepInfo] = []
         self.current_step: Optional[StepInfo] = None
+        # get_summary용 스텝 요약 - start/finish 시점에 갱신하여 매 호출 재계산 방지
+        self._summary_steps: List[Dict[str, Any]] = []
+        # step 간 재사용하는 provider 히스토리와 마지막으로 반영한 메시지 id
+        self.message_cache: List[ProviderMessage] = []
+        self.last_message_id: Optional[str] = None
         self.aborted = False
+        self.last_access = time.monotonic()
+        # agentic loop 실행 중 - 질문 대기 등으로 오래 접근이 없어도 LRU/TTL 정리 대상에서 제외
+        self.pinned = False
 
     @classmethod
     def get_or_create(cls, session_id: str, **kwargs) -> "SessionProcessor":
-        if session_id not in cls._processors:
-            cls._processors[session_id] = cls(session_id, **kwargs)
-        return cls._processors[session_id]
+        # await 없는 동기 메서드라 이벤트 루프 안에서 check-and-insert가 원자적
+        now = time.monotonic()
+        cls._evict_expired(now)
+        processor = cls._processors.get(session_id)
+        if processor is None:
+            processor = cls(session_id, **kwargs)
+            cls._processors[session_id] = processor
+            if len(cls._processors) > cls.MAX_PROCESSORS:
+                cls._evict_oldest_unpinned(keep=session_id)
+        else:
+            cls._processors.move_to_end(session_id)
+        processor.last_access = now
+        return processor
 
     @classmethod
-    def remove(cls, session_id: str) -> None:
-        if session_id in cls._processors:
+    def _evict_expired(cls, now: float) -> None:
+        """TTL이 지난 프로세서 정리 (가장 오래된 것부터, 만료되지 않은 항목에서 중단, pinned 제외)"""
+        expired = []
+        for session_id, processor in cls._processors.items():
+            if now - processor.last_access < cls.PROCESSOR_TTL:
+                break
+            if not processor.pinned:
+                expired.append(session_id)
+        for session_id in expired:
             del cls._processors[session_id]
 
+    @classmethod
+    def _evict_oldest_unpinned(cls, keep: str) -> None:
+        """크기 초과 시 실행 중이 아닌 가장 오래된 프로세서 하나 제거 (방금 만든 keep 제외)"""
+        victim = next((sid for sid, p in cls._processors.items() if not p.pinned and sid != keep), None)
+        if victim is not None:
+            del cls._processors[victim]
+
+    @classmethod
+    def remove(cls, session_id: str) -> None:
+        cls._processors.pop(session_id, None)
+
     def start_step(self) -> StepInfo:
         """새 스텝 시작"""
         step_num = len(self.steps) + 1
+        now = utc_now()
+        set_step_now(now)
         self.current_step = StepInfo(
             step=step_num,
-            started_at=datetime.utcnow()
+            started_at=now
         )
         self.steps.append(self.current_step)
+        self._summary_steps.append({
+            "step": step_num,
+            "status": self.current_step.status,
+            "tool_calls": self.current_step.tool_calls,
+            "duration": None,
+        })
         return self.current_step
 
     def finish_step(self, status: str = "completed") -> StepInfo:
         """현재 스텝 완료"""
-        if self.current_step:
-            self.current_step.finished_at = datetime.utcnow()
-            self.current_step.status = status
-        return self.current_step
+        step = self.current_step
+        if step:
+            step.finished_at = utc_now()
+            step.status = status
+            step.duration = (step.finished_at - step.started_at).total_seconds()
+            summary = self._summary_steps[step.step - 1]
+            summary["status"] = status
+            summary["duration"] = step.duration
+        set_step_now(None)
+        return step
 
     def record_tool_call(self, tool_name: str, tool_args: Optional[Dict[str, Any]] = None) -> bool:
         """도구 호출 기록, doom loop 감지 시 True 반환
@@ -136,8 +234,7 @@ class SessionProcessor:
 
     def is_doom_loop(self) -> bool:
         """현재 doom loop 상태인지 확인"""
-        return len(self.doom_detector.history) >= self.doom_detector.threshold and \
-               len(set(self.doom_detector.history[-self.doom_detector.threshold:])) == 1
+        return self.doom_detector.is_looping
 
     def should_continue(self) -> bool:
         """루프 계속 여부"""
@@ -153,22 +250,31 @@ class SessionProcessor:
         """프로세서 중단"""
         self.aborted = True
 
-    async def calculate_retry_delay(self, attempt: int) -> float:
+    def calculate_retry_delay(self, attempt: int) -> float:
         """exponential backoff 딜레이 계산"""
+        table = _delay_table(self.retry_config)
+        if attempt < len(table):
+            return table[attempt]
         delay = self.retry_config.base_delay * (self.retry_config.exponential_base ** attempt)
         return min(delay, self.retry_config.max_delay)
 
-    async def retry_with_backoff(self, func, *args, **kwargs):
-        """exponential backoff으로 함수 재시도"""
+    async def retry_with_backoff(
+        self,
+        func,
+        *args,
+        retryable: Tuple[type, ...] = _RETRYABLE,
+        **kwargs,
+    ):
+        """exponential backoff(+jitter)으로 함수 재시도, retryable 외 예외는 즉시 raise"""
         last_error = None
 
         for attempt in range(self.retry_config.max_retries):
             try:
                 return await func(*args, **kwargs)
-            except Exception as e:
+            except retryable as e:
                 last_error = e
                 if attempt < self.retry_config.max_retries - 1:
-                    delay = await self.calculate_retry_delay(attempt)
+                    delay = self.calculate_retry_delay(attempt) * (0.5 + random.random())
                     await asyncio.sleep(delay)
 
         raise last_error
@@ -181,13 +287,5 @@ class SessionProcessor:
             "max_steps": self.max_steps,
             "aborted": self.aborted,
             "doom_loop_detected": self.is_doom_loop(),
-            "steps": [
-                {
-                    "step": s.step,
-                    "status": s.status,
-                    "tool_calls": s.tool_calls,
-                    "duration": (s.finished_at - s.started_at).total_seconds() if s.finished_at else None
-                }
-                for s in self.steps
-            ]
+            "steps": self._summary_steps,
         }
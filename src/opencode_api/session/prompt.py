@@ -4,20 +4,35 @@ Session prompt handling with agentic loop support.
 
 from typing import Optional, List, Dict, Any, AsyncIterator, Literal
 from pydantic import BaseModel
+from functools import lru_cache
+import ast
 import asyncio
 import json
+import logging
+import weakref
 
-from .session import Session
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional - stdlib json fallback
+    _json_loads = json.loads
+
+from .session import Session, SessionInfo
 from .message import Message, MessagePart, AssistantMessage
 from .processor import SessionProcessor
 from ..provider import get_provider, list_providers
 from ..provider.provider import Message as ProviderMessage, StreamChunk, ToolCall
 from ..tool import get_tool, get_tools_schema, ToolContext, get_registry
 from ..core.config import settings
+from ..core.storage import Storage
+from ..core.clock import set_step_now
 from ..core.bus import Bus, PART_UPDATED, PartPayload, STEP_STARTED, STEP_FINISHED, StepPayload, TOOL_STATE_CHANGED, ToolStatePayload
 from ..agent import get as get_agent, default_agent, get_system_prompt, is_tool_allowed, AgentInfo, get_prompt_for_provider
 
 
+logger = logging.getLogger(__name__)
+
+
 class PromptInput(BaseModel):
     content: str
     provider_id: Optional[str] = None
@@ -31,13 +46,119 @@ class PromptInput(BaseModel):
     max_steps: Optional[int] = None  # None = use agent default
 
 
-class LoopState(BaseModel):
-    step: int = 0
-    max_steps: int = 50
-    auto_continue: bool = True
-    stop_reason: Optional[str] = None
-    paused: bool = False
-    pause_reason: Optional[str] = None
+class LoopState:
+    """agentic loop 내부 상태 (루프 안에서만 갱신하는 가변 구조체)
+
+    _loop_states가 약한 참조로 들고 있으므로 __weakref__ 슬롯 포함
+    (dataclass weakref_slot은 3.11+ 전용이라 직접 정의).
+    """
+    __slots__ = ("step", "max_steps", "auto_continue", "stop_reason", "paused", "pause_reason", "__weakref__")
+
+    def __init__(
+        self,
+        step: int = 0,
+        max_steps: int = 50,
+        auto_continue: bool = True,
+        stop_reason: Optional[str] = None,
+        paused: bool = False,
+        pause_reason: Optional[str] = None,
+    ):
+        self.step = step
+        self.max_steps = max_steps
+        self.auto_continue = auto_continue
+        self.stop_reason = stop_reason
+        self.paused = paused
+        self.pause_reason = pause_reason
+
+
+class HistoryView:
+    """히스토리 순회용 SoA 뷰 - 메시지/파트를 한 번만 풀어 병렬 리스트로 보관
+
+    메시지 mi의 파트는 part_*[msg_boundaries[mi]:msg_boundaries[mi + 1]] 구간.
+    """
+    __slots__ = ("roles", "contents", "part_types", "part_texts", "part_tool_outputs", "msg_boundaries")
+
+    def __init__(self, history: List):
+        roles: List[str] = []
+        contents: List[Optional[str]] = []
+        part_types: List[str] = []
+        part_texts: List[Optional[str]] = []
+        part_tool_outputs: List[Optional[str]] = []
+        msg_boundaries: List[int] = [0]
+
+        for msg in history:
+            roles.append(msg.role)
+            contents.append(getattr(msg, "content", None))
+            for part in getattr(msg, "parts", ()):
+                part_types.append(part.type)
+                part_texts.append(part.content)
+                part_tool_outputs.append(part.tool_output)
+            msg_boundaries.append(len(part_types))
+
+        self.roles = roles
+        self.contents = contents
+        self.part_types = part_types
+        self.part_texts = part_texts
+        self.part_tool_outputs = part_tool_outputs
+        self.msg_boundaries = msg_boundaries
+
+    def __len__(self) -> int:
+        return len(self.roles)
+
+
+class _PartDebouncer:
+    """스트리밍 파트 content 갱신을 FLUSH_INTERVAL 단위로 합쳐 기록
+
+    청크마다 update_part를 부르지 않고 마지막 스냅샷만 주기적으로 쓴다.
+    close()는 진행 중인 쓰기를 기다린 뒤 최종 내용을 한 번 더 기록한다.
+    """
+    __slots__ = ("session_id", "message_id", "part_id", "user_id", "content", "_written", "_task", "_sleeping")
+
+    FLUSH_INTERVAL = 0.1  # seconds
+
+    def __init__(self, session_id: str, message_id: str, part_id: str, content: str, user_id: Optional[str] = None):
+        self.session_id = session_id
+        self.message_id = message_id
+        self.part_id = part_id
+        self.user_id = user_id
+        self.content = content
+        self._written = content  # add_part로 이미 저장된 내용
+        self._task: Optional[asyncio.Task] = None
+        self._sleeping = False
+
+    def update(self, content: str) -> None:
+        self.content = content
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        self._sleeping = True
+        await asyncio.sleep(self.FLUSH_INTERVAL)
+        self._sleeping = False
+        await self._write()
+
+    async def _write(self) -> None:
+        content = self.content
+        if content is self._written:
+            return
+        await Message.update_part(
+            self.session_id,
+            self.message_id,
+            self.part_id,
+            {"content": content},
+            self.user_id
+        )
+        self._written = content
+
+    async def close(self) -> None:
+        task = self._task
+        if task is not None and not task.done():
+            if self._sleeping:
+                task.cancel()
+            else:
+                # 쓰기 도중 취소하면 오래된 스냅샷이 나중에 도착할 수 있음
+                await task
+        await self._write()
 
 
 import re
@@ -45,12 +166,93 @@ FAKE_TOOL_CALL_PATTERN = re.compile(
     r'\[Called\s+tool:\s*(\w+)\s*\(\s*(\{[^}]*\}|\{[^)]*\}|[^)]*)\s*\)\]',
     re.IGNORECASE
 )
+# Pattern: 'key': 'value' or "key": "value"
+_KV_PATTERN = re.compile(r'["\']?(\w+)["\']?\s*:\s*["\']([^"\']+)["\']')
+
+# litellm으로 라우팅할 model_id prefix (새 provider는 여기에 추가)
+_LITELLM_MODEL_RE = re.compile(r"(?:gemini/|groq/|deepseek/|openrouter/|zai/|claude-|gpt-|o1)")
+
+
+class _DeferredEvent:
+    """delay 후에 Bus 이벤트 발행 - 그 전에 settle()되면 발행하지 않음"""
+    __slots__ = ("event", "payload", "_handle", "_task")
+
+    DELAY = 0.05  # seconds
+
+    def __init__(self, event: Any, payload: BaseModel):
+        self.event = event
+        self.payload = payload
+        self._task: Optional[asyncio.Task] = None
+        self._handle = asyncio.get_running_loop().call_later(self.DELAY, self._fire)
+
+    def _fire(self) -> None:
+        self._task = asyncio.ensure_future(Bus.publish(self.event, self.payload))
+
+    def cancel(self) -> None:
+        self._handle.cancel()
+
+    async def settle(self) -> None:
+        self._handle.cancel()
+        if self._task is not None:
+            await self._task
+
+
+_STREAM_END = object()
+
+
+async def _buffered(source: AsyncIterator[Any], n: int = 1) -> AsyncIterator[Any]:
+    """source를 백그라운드 태스크에서 최대 n개 앞서 읽음
+
+    소비자가 청크를 저장하는 동안 다음 provider 청크 수신이 겹치도록 한다.
+    source의 예외는 소비자 쪽에서 그대로 다시 발생한다.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=n)
+
+    async def produce() -> None:
+        try:
+            async for item in source:
+                await queue.put((item, None))
+            await queue.put((_STREAM_END, None))
+        except Exception as e:
+            await queue.put((_STREAM_END, e))
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _STREAM_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        producer.cancel()
+
+
+@lru_cache(maxsize=64)
+def _base_system_prompt(provider_id: str, agent_prompt: str) -> Optional[str]:
+    """provider + agent 시스템 프롬프트 - (provider, agent) 조합마다 한 번만 조립"""
+    parts = []
+
+    # Add provider-specific system prompt (optimized for Claude/Gemini/etc.)
+    provider_prompt = get_prompt_for_provider(provider_id)
+    if provider_prompt:
+        parts.append(provider_prompt)
+
+    # Add agent-specific prompt (if defined and different from provider prompt)
+    if agent_prompt and agent_prompt != provider_prompt:
+        parts.append(agent_prompt)
+
+    return "\n\n".join(parts) if parts else None
 
 
 class SessionPrompt:
     
-    _active_sessions: Dict[str, asyncio.Task] = {}
-    _loop_states: Dict[str, LoopState] = {}
+    # 약한 참조 - 루프 코루틴(또는 태스크)이 끝나면 finally를 건너뛰어도 자동 정리
+    _active_sessions: "weakref.WeakValueDictionary[str, asyncio.Task]" = weakref.WeakValueDictionary()
+    _loop_states: "weakref.WeakValueDictionary[str, LoopState]" = weakref.WeakValueDictionary()
+    # 동시에 실행되는 도구 수 상한 (프로세스 전체)
+    _tool_semaphore = asyncio.Semaphore(max(1, settings.max_parallel_tools))
     
     @classmethod
     async def prompt(
@@ -70,10 +272,10 @@ class SessionPrompt:
         max_steps = input.max_steps if input.max_steps is not None else agent.max_steps
         
         if auto_continue:
-            async for chunk in cls._agentic_loop(session_id, input, agent, max_steps, user_id):
+            async for chunk in cls._agentic_loop(session_id, input, agent, max_steps, user_id, session=session):
                 yield chunk
         else:
-            async for chunk in cls._single_turn(session_id, input, agent, user_id=user_id):
+            async for chunk in cls._single_turn(session_id, input, agent, user_id=user_id, session=session):
                 yield chunk
     
     @classmethod
@@ -83,13 +285,26 @@ class SessionPrompt:
         input: PromptInput,
         agent: AgentInfo,
         max_steps: int,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        session: Optional[SessionInfo] = None
     ) -> AsyncIterator[StreamChunk]:
         state = LoopState(step=0, max_steps=max_steps, auto_continue=True)
         cls._loop_states[session_id] = state
 
         # SessionProcessor 가져오기
         processor = SessionProcessor.get_or_create(session_id, max_steps=max_steps)
+        processor.pinned = True
+
+        # 2번째 step부터 쓰는 입력 - 매 step 동일하므로 한 번만 생성
+        continuation_input = PromptInput(
+            content="",
+            provider_id=input.provider_id,
+            model_id=input.model_id,
+            temperature=input.temperature,
+            max_tokens=input.max_tokens,
+            tools_enabled=input.tools_enabled,
+            auto_continue=False,
+        )
 
         try:
             while processor.should_continue() and not state.paused:
@@ -103,36 +318,32 @@ class SessionPrompt:
                     max_steps=max_steps
                 ))
 
-                print(f"[AGENTIC LOOP] Starting step {state.step}, stop_reason={state.stop_reason}", flush=True)
+                logger.debug("[AGENTIC LOOP] Starting step %d, stop_reason=%s", state.step, state.stop_reason)
 
-                turn_input = input if state.step == 1 else PromptInput(
-                    content="",
-                    provider_id=input.provider_id,
-                    model_id=input.model_id,
-                    temperature=input.temperature,
-                    max_tokens=input.max_tokens,
-                    tools_enabled=input.tools_enabled,
-                    auto_continue=False,
-                )
+                turn_input = input if state.step == 1 else continuation_input
 
                 if state.step > 1:
                     yield StreamChunk(type="step", text=f"Step {state.step}")
 
                 # Track tool calls in this turn
                 has_tool_calls_this_turn = False
+                tool_results_this_turn = 0
+                terminating_results = 0
 
                 async for chunk in cls._single_turn(
                     session_id,
                     turn_input,
                     agent,
                     is_continuation=(state.step > 1),
-                    user_id=user_id
+                    user_id=user_id,
+                    processor=processor,
+                    session=session
                 ):
                     yield chunk
 
                     if chunk.type == "tool_call" and chunk.tool_call:
                         has_tool_calls_this_turn = True
-                        print(f"[AGENTIC LOOP] tool_call: {chunk.tool_call.name}", flush=True)
+                        logger.debug("[AGENTIC LOOP] tool_call: %s", chunk.tool_call.name)
 
                         if chunk.tool_call.name == "question" and agent.pause_on_question:
                             state.paused = True
@@ -140,37 +351,48 @@ class SessionPrompt:
 
                     # question tool이 완료되면 (답변 받음) pause 해제
                     elif chunk.type == "tool_result":
+                        tool_results_this_turn += 1
+                        if chunk.terminate:
+                            terminating_results += 1
                         if state.paused and state.pause_reason == "question":
                             state.paused = False
                             state.pause_reason = None
 
                     elif chunk.type == "done":
                         state.stop_reason = chunk.stop_reason
-                        print(f"[AGENTIC LOOP] done: stop_reason={chunk.stop_reason}", flush=True)
+                        logger.debug("[AGENTIC LOOP] done: stop_reason=%s", chunk.stop_reason)
 
                 # 스텝 완료
                 step_status = "completed"
                 if processor.is_doom_loop():
                     step_status = "doom_loop"
-                    print(f"[AGENTIC LOOP] Doom loop detected! Stopping execution.", flush=True)
+                    logger.warning("[AGENTIC LOOP] Doom loop detected in session %s, stopping execution", session_id)
                     yield StreamChunk(type="text", text=f"\n[경고: 동일 도구 반복 호출 감지, 루프를 중단합니다]\n")
 
                 processor.finish_step(status=step_status)
+                await Storage.flush()
                 await Bus.publish(STEP_FINISHED, StepPayload(
                     session_id=session_id,
                     step=state.step,
                     max_steps=max_steps
                 ))
 
-                print(f"[AGENTIC LOOP] End of step {state.step}: stop_reason={state.stop_reason}, has_tool_calls={has_tool_calls_this_turn}", flush=True)
+                logger.debug(
+                    "[AGENTIC LOOP] End of step %d: stop_reason=%s, has_tool_calls=%s",
+                    state.step, state.stop_reason, has_tool_calls_this_turn
+                )
 
                 # Doom loop 감지 시 중단
                 if processor.is_doom_loop():
                     break
 
+                # 모든 도구 결과가 종료를 요청하면 후속 LLM 호출 없이 종료
+                if tool_results_this_turn and terminating_results == tool_results_this_turn:
+                    break
+
                 # If this turn had no new tool calls (just text response), we're done
                 if state.stop_reason != "tool_calls":
-                    print(f"[AGENTIC LOOP] Breaking: stop_reason != tool_calls", flush=True)
+                    logger.debug("[AGENTIC LOOP] Breaking: stop_reason != tool_calls")
                     break
 
             # Loop 종료 후 상태 메시지만 출력 (summary LLM 호출 없음!)
@@ -181,30 +403,17 @@ class SessionPrompt:
             # else: 자연스럽게 종료 (추가 출력 없음)
 
         finally:
-            if session_id in cls._loop_states:
-                del cls._loop_states[session_id]
+            # 스텝이 오류/취소로 끝나 finish_step이 호출되지 않아도 스텝 시각 해제
+            set_step_now(None)
+            cls._loop_states.pop(session_id, None)
             # SessionProcessor 정리
             SessionProcessor.remove(session_id)
     
     @classmethod
     def _infer_provider_from_model(cls, model_id: str) -> str:
         """model_id에서 provider_id를 추론"""
-        # LiteLLM prefix 기반 모델은 litellm provider 사용
-        litellm_prefixes = ["gemini/", "groq/", "deepseek/", "openrouter/", "zai/"]
-        for prefix in litellm_prefixes:
-            if model_id.startswith(prefix):
-                return "litellm"
-
-        # Claude 모델
-        if model_id.startswith("claude-"):
-            return "litellm"
-
-        # GPT/O1 모델
-        if model_id.startswith("gpt-") or model_id.startswith("o1"):
-            return "litellm"
-
-        # 기본값
-        return settings.default_provider
+        # LiteLLM prefix / Claude / GPT·O1 모델은 litellm provider, 그 외는 기본값
+        return "litellm" if _LITELLM_MODEL_RE.match(model_id) else settings.default_provider
 
     @classmethod
     async def _single_turn(
@@ -213,9 +422,13 @@ class SessionPrompt:
         input: PromptInput,
         agent: AgentInfo,
         is_continuation: bool = False,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        processor: Optional[SessionProcessor] = None,
+        session: Optional[SessionInfo] = None
     ) -> AsyncIterator[StreamChunk]:
-        session = await Session.get(session_id, user_id)
+        # 루프 중 provider/model/agent는 바뀌지 않으므로 호출자가 읽은 세션 재사용
+        if session is None:
+            session = await Session.get(session_id, user_id)
 
         model_id = input.model_id or session.model_id or settings.default_model
 
@@ -227,11 +440,11 @@ class SessionPrompt:
         else:
             provider_id = cls._infer_provider_from_model(model_id)
 
-        print(f"[Prompt DEBUG] input.provider_id={input.provider_id}, session.provider_id={session.provider_id}", flush=True)
-        print(f"[Prompt DEBUG] Final provider_id={provider_id}, model_id={model_id}", flush=True)
+        logger.debug("input.provider_id=%s, session.provider_id=%s", input.provider_id, session.provider_id)
+        logger.debug("Final provider_id=%s, model_id=%s", provider_id, model_id)
 
         provider = get_provider(provider_id)
-        print(f"[Prompt DEBUG] Got provider: {provider}", flush=True)
+        logger.debug("Got provider: %s", provider)
         if not provider:
             yield StreamChunk(type="error", error=f"Provider not found: {provider_id}")
             return
@@ -243,8 +456,7 @@ class SessionPrompt:
         assistant_msg = await Message.create_assistant(session_id, provider_id, model_id, user_id)
         
         # Build message history
-        history = await Message.list(session_id, user_id=user_id)
-        messages = cls._build_messages(history[:-1], include_tool_results=True)
+        messages = await cls._load_history(session_id, assistant_msg.id, processor, user_id)
         
         # Build system prompt with provider-specific optimization
         system_prompt = cls._build_system_prompt(agent, provider_id, input.system)
@@ -258,16 +470,23 @@ class SessionPrompt:
         # reasoning 저장을 위한 변수
         current_reasoning_part: Optional[MessagePart] = None
         accumulated_reasoning = ""
+
+        # text/reasoning 파트 content 지연 기록
+        text_writer: Optional[_PartDebouncer] = None
+        reasoning_writer: Optional[_PartDebouncer] = None
+
+        # 실행 중인 도구 (호출 순서 유지): (tool_call, tool_call 파트 id, task, running 이벤트)
+        pending_tools: List[tuple[ToolCall, str, asyncio.Task, "_DeferredEvent"]] = []
         
         try:
-            async for chunk in provider.stream(
+            async for chunk in _buffered(provider.stream(
                 model_id=model_id,
                 messages=messages,
                 tools=tools_schema,
                 system=system_prompt,
                 temperature=input.temperature or agent.temperature,
                 max_tokens=input.max_tokens or agent.max_tokens,
-            ):
+            ), n=2):
                 if chunk.type == "text":
                     accumulated_text += chunk.text or ""
                     
@@ -275,23 +494,15 @@ class SessionPrompt:
                         current_text_part = await Message.add_part(
                             assistant_msg.id,
                             session_id,
-                            MessagePart(
-                                id="",
-                                session_id=session_id,
-                                message_id=assistant_msg.id,
-                                type="text",
+                            assistant_msg.make_part(
+                                "text",
                                 content=accumulated_text
                             ),
                             user_id
                         )
+                        text_writer = _PartDebouncer(session_id, assistant_msg.id, current_text_part.id, accumulated_text, user_id)
                     else:
-                        await Message.update_part(
-                            session_id,
-                            assistant_msg.id,
-                            current_text_part.id,
-                            {"content": accumulated_text},
-                            user_id
-                        )
+                        text_writer.update(accumulated_text)
                     
                     yield chunk
                 
@@ -310,11 +521,8 @@ class SessionPrompt:
                         tool_part = await Message.add_part(
                             assistant_msg.id,
                             session_id,
-                            MessagePart(
-                                id="",
-                                session_id=session_id,
-                                message_id=assistant_msg.id,
-                                type="tool_call",
+                            assistant_msg.make_part(
+                                "tool_call",
                                 tool_call_id=tc.id,
                                 tool_name=tc.name,
                                 tool_args=tc.arguments,
@@ -327,8 +535,8 @@ class SessionPrompt:
                         # This is critical for interactive tools like 'question'
                         yield chunk
 
-                        # 도구 실행 시작 이벤트 발행
-                        await Bus.publish(TOOL_STATE_CHANGED, ToolStatePayload(
+                        # 도구 실행 시작 이벤트 - 빨리 끝나는 도구는 완료 이벤트만 발행되도록 지연
+                        running_event = _DeferredEvent(TOOL_STATE_CHANGED, ToolStatePayload(
                             session_id=session_id,
                             message_id=assistant_msg.id,
                             part_id=tool_part.id,
@@ -336,38 +544,31 @@ class SessionPrompt:
                             status="running"
                         ))
 
-                        # Execute tool (may block for user input, e.g., question tool)
-                        tool_result, tool_status = await cls._execute_tool(
-                            session_id,
-                            assistant_msg.id,
-                            tc.id,
-                            tc.name,
-                            tc.arguments,
-                            user_id
-                        )
-
-                        # tool_call 파트의 status를 completed/error로 업데이트
-                        await Message.update_part(
-                            session_id,
-                            assistant_msg.id,
-                            tool_part.id,
-                            {"tool_status": tool_status},
-                            user_id
-                        )
-
-                        # 도구 완료 이벤트 발행
-                        await Bus.publish(TOOL_STATE_CHANGED, ToolStatePayload(
-                            session_id=session_id,
-                            message_id=assistant_msg.id,
-                            part_id=tool_part.id,
-                            tool_name=tc.name,
-                            status=tool_status
-                        ))
-
-                        yield StreamChunk(
-                            type="tool_result",
-                            text=tool_result
-                        )
+                        if tc.name == "question":
+                            # 사용자 입력을 기다리는 도구 - 앞선 결과를 먼저 내보내고 인라인 실행
+                            async for result_chunk in cls._drain_tools(session_id, assistant_msg.id, pending_tools, user_id):
+                                yield result_chunk
+                            tool_result, tool_status, terminate = await cls._execute_tool(
+                                session_id,
+                                assistant_msg.id,
+                                tc.id,
+                                tc.name,
+                                tc.arguments,
+                                user_id
+                            )
+                            yield await cls._finish_tool_call(
+                                session_id, assistant_msg.id, tool_part.id, tc.name, tool_result, tool_status, user_id,
+                                terminate=terminate, running_event=running_event
+                            )
+                        else:
+                            # 도구를 먼저 실행시키고 스트림은 계속 소비 - 결과는 다음 요청 전에 모음
+                            pending_tools.append((tc, tool_part.id, asyncio.create_task(cls._run_tool(
+                                session_id,
+                                assistant_msg.id,
+                                tc.id,
+                                tc.name,
+                                tc.arguments,
+                            )), running_event))
                     else:
                         yield chunk
                 
@@ -379,27 +580,21 @@ class SessionPrompt:
                         current_reasoning_part = await Message.add_part(
                             assistant_msg.id,
                             session_id,
-                            MessagePart(
-                                id="",
-                                session_id=session_id,
-                                message_id=assistant_msg.id,
-                                type="reasoning",
+                            assistant_msg.make_part(
+                                "reasoning",
                                 content=accumulated_reasoning
                             ),
                             user_id
                         )
+                        reasoning_writer = _PartDebouncer(session_id, assistant_msg.id, current_reasoning_part.id, accumulated_reasoning, user_id)
                     else:
-                        await Message.update_part(
-                            session_id,
-                            assistant_msg.id,
-                            current_reasoning_part.id,
-                            {"content": accumulated_reasoning},
-                            user_id
-                        )
+                        reasoning_writer.update(accumulated_reasoning)
 
                     yield chunk
                 
                 elif chunk.type == "done":
+                    async for result_chunk in cls._drain_tools(session_id, assistant_msg.id, pending_tools, user_id):
+                        yield result_chunk
                     if chunk.usage:
                         await Message.set_usage(session_id, assistant_msg.id, chunk.usage, user_id)
                     yield chunk
@@ -408,12 +603,29 @@ class SessionPrompt:
                     await Message.set_error(session_id, assistant_msg.id, chunk.error or "Unknown error", user_id)
                     yield chunk
             
-            await Session.touch(session_id)
+            async for result_chunk in cls._drain_tools(session_id, assistant_msg.id, pending_tools, user_id):
+                yield result_chunk
+            
+            # 텍스트로 흉내 낸 도구 호출은 실행하지 않음 - 해당 provider에서만 스트림 끝에 한 번 검사
+            # 로그용이라 도구 이름만 매칭 (인자 파싱 없음)
+            if provider.emits_fake_tool_calls and accumulated_text:
+                fake_match = FAKE_TOOL_CALL_PATTERN.search(accumulated_text)
+                if fake_match:
+                    logger.warning("Model %s wrote a fake tool call as text: %s", model_id, fake_match.group(1))
+            
+            await Session.touch(session_id, user_id)
             
         except Exception as e:
             error_msg = str(e)
             await Message.set_error(session_id, assistant_msg.id, error_msg, user_id)
             yield StreamChunk(type="error", error=error_msg)
+        finally:
+            # 중단/오류로 모으지 못한 도구 실행 취소 - 파트/이벤트도 error로 마무리
+            await cls._cancel_tools(session_id, assistant_msg.id, pending_tools, user_id)
+            # 마지막 text/reasoning 스냅샷 기록
+            for writer in (text_writer, reasoning_writer):
+                if writer is not None:
+                    await writer.close()
     
     @classmethod
     def _detect_fake_tool_call(cls, text: str) -> Optional[Dict[str, Any]]:
@@ -433,19 +645,19 @@ class SessionPrompt:
             tool_name = match.group(1)
             args_str = match.group(2).strip()
             
-            # Try to parse arguments
+            # Try to parse arguments: JSON -> Python dict literal -> key/value scan
             args = {}
             if args_str:
                 try:
-                    # Handle both JSON and Python dict formats
-                    args_str = args_str.replace("'", '"')  # Convert Python dict to JSON
-                    args = json.loads(args_str)
-                except json.JSONDecodeError:
-                    # Try to extract key-value pairs manually
-                    # Pattern: 'key': 'value' or "key": "value"
-                    kv_pattern = re.compile(r'["\']?(\w+)["\']?\s*:\s*["\']([^"\']+)["\']')
-                    for kv_match in kv_pattern.finditer(args_str):
-                        args[kv_match.group(1)] = kv_match.group(2)
+                    args = _json_loads(args_str)
+                except (ValueError, RecursionError):
+                    try:
+                        args = ast.literal_eval(args_str)
+                    except Exception:
+                        # {[1]: 2} -> TypeError, 깊은 중첩 -> RecursionError/MemoryError 등
+                        args = None
+                    if not isinstance(args, dict):
+                        args = dict(_KV_PATTERN.findall(args_str))
             
             return {
                 "name": tool_name,
@@ -471,23 +683,41 @@ class SessionPrompt:
         Returns:
             The complete system prompt, or None if empty
         """
-        parts = []
-
-        # Add provider-specific system prompt (optimized for Claude/Gemini/etc.)
-        provider_prompt = get_prompt_for_provider(provider_id)
-        if provider_prompt:
-            parts.append(provider_prompt)
-
-        # Add agent-specific prompt (if defined and different from provider prompt)
-        agent_prompt = get_system_prompt(agent)
-        if agent_prompt and agent_prompt != provider_prompt:
-            parts.append(agent_prompt)
+        base = _base_system_prompt(provider_id, get_system_prompt(agent))
+        # 요청마다 다른 custom_system은 캐시 키에 넣지 않고 뒤에 붙임
+        if not custom_system:
+            return base
+        return f"{base}\n\n{custom_system}" if base else custom_system
+    
+    @classmethod
+    async def _load_history(
+        cls,
+        session_id: str,
+        current_message_id: str,
+        processor: Optional[SessionProcessor] = None,
+        user_id: Optional[str] = None
+    ) -> List[ProviderMessage]:
+        """provider에 보낼 히스토리 (현재 assistant 메시지 제외)
 
-        # Add custom system prompt
-        if custom_system:
-            parts.append(custom_system)
+        agentic loop에서는 processor에 빌드 결과를 보관하고, 다음 step부터는
+        마지막으로 반영한 메시지 이후 것만 읽어 volatile suffix 뒤에 붙인다.
+        """
+        if processor is None or processor.last_message_id is None:
+            history = await Message.list(session_id, user_id=user_id)
+            history = [m for m in history if m.id != current_message_id]
+            messages = cls._build_messages(history, include_tool_results=True)
+            if processor is not None:
+                processor.message_cache = messages
+                processor.last_message_id = max((m.id for m in history), default="")
+            return messages
 
-        return "\n\n".join(parts) if parts else None
+        new_messages = await Message.list_since(session_id, processor.last_message_id, user_id)
+        new_messages = [m for m in new_messages if m.id != current_message_id]
+        if new_messages:
+            hv = HistoryView(new_messages)
+            processor.message_cache.extend(cls._history_messages(hv, 0, len(hv), include_tool_results=True))
+            processor.last_message_id = new_messages[-1].id
+        return processor.message_cache
     
     @classmethod
     def _build_messages(
@@ -502,62 +732,201 @@ class SessionPrompt:
         2. Assistant message (may include tool calls)
         3. Tool results (as user message with tool context)
         4. Assistant continues
+        
+        History is ordered by (monotonic ULID) message id and split at the
+        last user prompt: earlier turns form a byte-stable prefix that is
+        identical on every step, the current turn (prompt + in-flight tool
+        results) is appended after it. The last prefix message is tagged
+        with cache_breakpoint so providers can cache the prefix.
         """
-        messages = []
+        hv = HistoryView(sorted(history, key=lambda m: m.id))
         
-        for msg in history:
-            if msg.role == "user":
+        boundary = 0
+        for mi in range(len(hv) - 1, -1, -1):
+            if hv.roles[mi] == "user" and hv.contents[mi]:
+                boundary = mi
+                break
+        
+        messages = cls._build_stable_prefix(hv, boundary, include_tool_results)
+        messages.extend(cls._build_volatile_suffix(hv, boundary, include_tool_results))
+        return messages
+    
+    @classmethod
+    def _build_stable_prefix(cls, hv: HistoryView, end: int, include_tool_results: bool = True) -> List[ProviderMessage]:
+        """완료된 이전 턴 - 매 step 동일한 바이트로 출력"""
+        messages = cls._history_messages(hv, 0, end, include_tool_results)
+        if messages:
+            messages[-1].cache_breakpoint = True
+        return messages
+    
+    @classmethod
+    def _build_volatile_suffix(cls, hv: HistoryView, start: int, include_tool_results: bool = True) -> List[ProviderMessage]:
+        """현재 턴 (사용자 프롬프트 + 진행 중인 tool 결과)"""
+        return cls._history_messages(hv, start, len(hv), include_tool_results)
+    
+    @classmethod
+    def _history_messages(
+        cls,
+        hv: HistoryView,
+        start: int,
+        end: int,
+        include_tool_results: bool = True
+    ) -> List[ProviderMessage]:
+        roles = hv.roles
+        contents = hv.contents
+        part_types = hv.part_types
+        part_texts = hv.part_texts
+        part_tool_outputs = hv.part_tool_outputs
+        bounds = hv.msg_boundaries
+        
+        # 메시지당 최대 2개 (assistant text + tool 결과) - 미리 할당
+        result: List[Optional[ProviderMessage]] = [None] * (2 * (end - start))
+        n = 0
+        
+        # role/content는 방금 만든 str이므로 검증 없이 model_construct로 생성
+        for mi in range(start, end):
+            role = roles[mi]
+            if role == "user":
                 # Skip empty user messages (continuations)
-                if msg.content:
-                    messages.append(ProviderMessage(role="user", content=msg.content))
+                content = contents[mi]
+                if content:
+                    result[n] = ProviderMessage.model_construct(role="user", content=content)
+                    n += 1
+                continue
             
-            elif msg.role == "assistant":
-                # Collect all parts
-                text_parts = []
-                tool_calls = []
-                tool_results = []
-                
-                for part in getattr(msg, "parts", []):
-                    if part.type == "text" and part.content:
-                        text_parts.append(part.content)
-                    elif part.type == "tool_call" and include_tool_results:
-                        tool_calls.append({
-                            "id": part.tool_call_id,
-                            "name": part.tool_name,
-                            "arguments": part.tool_args or {}
-                        })
-                    elif part.type == "tool_result" and include_tool_results:
-                        tool_results.append({
-                            "tool_call_id": part.tool_call_id,
-                            "output": part.tool_output or ""
-                        })
-                
-                # Build assistant content - only text, NO tool call summaries
-                # IMPORTANT: Do NOT include "[Called tool: ...]" patterns as this causes
-                # models like Gemini to mimic the pattern instead of using actual tool calls
-                assistant_content_parts = []
-                
-                if text_parts:
-                    assistant_content_parts.append("".join(text_parts))
-                
-                if assistant_content_parts:
-                    messages.append(ProviderMessage(
-                        role="assistant", 
-                        content="\n".join(assistant_content_parts)
-                    ))
-                
-                # Add tool results as user message (simulating tool response)
-                if tool_results:
-                    result_content = []
-                    for result in tool_results:
-                        result_content.append(f"Tool result:\n{result['output']}")
-                    messages.append(ProviderMessage(
-                        role="user",
-                        content="\n\n".join(result_content)
-                    ))
+            if role != "assistant":
+                continue
+            
+            # 파트를 한 번만 순회 - 버퍼는 실제로 필요할 때만 생성
+            text_parts: Optional[List[str]] = None
+            tool_results: Optional[List[str]] = None
+            for pi in range(bounds[mi], bounds[mi + 1]):
+                part_type = part_types[pi]
+                if part_type == "text":
+                    text = part_texts[pi]
+                    if text:
+                        if text_parts is None:
+                            text_parts = [text]
+                        else:
+                            text_parts.append(text)
+                elif include_tool_results and part_type == "tool_result":
+                    tool_result = f"Tool result:\n{part_tool_outputs[pi] or ''}"
+                    if tool_results is None:
+                        tool_results = [tool_result]
+                    else:
+                        tool_results.append(tool_result)
+            
+            # Build assistant content - only text, NO tool call summaries
+            # IMPORTANT: Do NOT include "[Called tool: ...]" patterns as this causes
+            # models like Gemini to mimic the pattern instead of using actual tool calls
+            if text_parts is not None:
+                content = text_parts[0] if len(text_parts) == 1 else "".join(text_parts)
+                result[n] = ProviderMessage.model_construct(role="assistant", content=content)
+                n += 1
+            
+            # Add tool results as user message (simulating tool response)
+            if tool_results is not None:
+                content = tool_results[0] if len(tool_results) == 1 else "\n\n".join(tool_results)
+                result[n] = ProviderMessage.model_construct(role="user", content=content)
+                n += 1
         
-        return messages
+        return result[:n]
     
+    @classmethod
+    async def _drain_tools(
+        cls,
+        session_id: str,
+        message_id: str,
+        pending: List[tuple[ToolCall, str, asyncio.Task, "_DeferredEvent"]],
+        user_id: Optional[str] = None
+    ) -> AsyncIterator[StreamChunk]:
+        """먼저 실행시킨 도구 결과를 호출 순서대로 저장하고 tool_result로 내보냄"""
+        if not pending:
+            return
+        batch = list(pending)
+        results = await asyncio.gather(*(task for _, _, task, _ in batch), return_exceptions=True)
+        pending.clear()
+        for (tc, part_id, _, running_event), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                tool_result, tool_status, terminate = f"Error executing tool: {str(result)}", "error", False
+            else:
+                tool_result, tool_status, terminate = result
+            await cls._store_tool_result(session_id, message_id, tc.id, tool_result, user_id)
+            yield await cls._finish_tool_call(
+                session_id, message_id, part_id, tc.name, tool_result, tool_status, user_id,
+                terminate=terminate, running_event=running_event
+            )
+
+    @classmethod
+    async def _cancel_tools(
+        cls,
+        session_id: str,
+        message_id: str,
+        pending: List[tuple[ToolCall, str, asyncio.Task, "_DeferredEvent"]],
+        user_id: Optional[str] = None
+    ) -> None:
+        """먼저 실행시킨 도구를 취소하고 tool_call 파트를 error로 정리
+
+        tool_result 파트와 최종 TOOL_STATE_CHANGED를 남겨 클라이언트에 running으로
+        남지 않게 하고, 다음 턴 히스토리에 응답 없는 tool_call이 생기지 않게 한다.
+        """
+        if not pending:
+            return
+        batch = list(pending)
+        pending.clear()
+        for _, _, task, _ in batch:
+            task.cancel()
+        output = "Error: tool execution cancelled"
+        for tc, part_id, _, running_event in batch:
+            try:
+                await cls._store_tool_result(session_id, message_id, tc.id, output, user_id)
+                await cls._finish_tool_call(
+                    session_id, message_id, part_id, tc.name, output, "error", user_id,
+                    running_event=running_event
+                )
+            except Exception:
+                logger.exception("Failed to mark cancelled tool %s (%s) as error", tc.name, part_id)
+            finally:
+                running_event.cancel()
+
+    @classmethod
+    async def _finish_tool_call(
+        cls,
+        session_id: str,
+        message_id: str,
+        part_id: str,
+        tool_name: str,
+        tool_result: str,
+        tool_status: str,
+        user_id: Optional[str] = None,
+        terminate: bool = False,
+        running_event: Optional["_DeferredEvent"] = None
+    ) -> StreamChunk:
+        """tool_call 파트 상태 갱신 + 완료 이벤트 발행 후 tool_result 청크 반환"""
+        if running_event is not None:
+            # 아직 안 나간 running 이벤트는 생략, 나가는 중이면 순서 보장을 위해 대기
+            await running_event.settle()
+
+        # tool_call 파트의 status를 completed/error로 업데이트
+        await Message.update_part(
+            session_id,
+            message_id,
+            part_id,
+            {"tool_status": tool_status},
+            user_id
+        )
+
+        # 도구 완료 이벤트 발행
+        await Bus.publish(TOOL_STATE_CHANGED, ToolStatePayload(
+            session_id=session_id,
+            message_id=message_id,
+            part_id=part_id,
+            tool_name=tool_name,
+            status=tool_status
+        ))
+
+        return StreamChunk(type="tool_result", text=tool_result, terminate=terminate)
+
     @classmethod
     async def _execute_tool(
         cls,
@@ -567,50 +936,63 @@ class SessionPrompt:
         tool_name: str,
         tool_args: Dict[str, Any],
         user_id: Optional[str] = None
-    ) -> tuple[str, str]:
-        """Execute a tool and store the result. Returns (output, status)."""
+    ) -> tuple[str, str, bool]:
+        """Execute a tool and store the result. Returns (output, status, terminate)."""
+        output, status, terminate = await cls._run_tool(session_id, message_id, tool_call_id, tool_name, tool_args, limit=False)
+        await cls._store_tool_result(session_id, message_id, tool_call_id, output, user_id)
+        return output, status, terminate
+
+    @classmethod
+    async def _store_tool_result(
+        cls,
+        session_id: str,
+        message_id: str,
+        tool_call_id: str,
+        output: str,
+        user_id: Optional[str] = None
+    ) -> None:
+        await Message.add_part(
+            message_id,
+            session_id,
+            MessagePart(
+                id="",
+                session_id=session_id,
+                message_id=message_id,
+                type="tool_result",
+                tool_call_id=tool_call_id,
+                tool_output=output
+            ),
+            user_id
+        )
+
+    @classmethod
+    async def _run_tool(
+        cls,
+        session_id: str,
+        message_id: str,
+        tool_call_id: str,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        limit: bool = True
+    ) -> tuple[str, str, bool]:
+        """Run a tool without storing the result. Returns (output, status, terminate).
+
+        limit=False는 사용자 입력을 기다리는 인라인 실행용 (동시 실행 슬롯을 점유하지 않음)
+        """
         # SessionProcessor를 통한 doom loop 감지
         # tool_args도 전달하여 같은 도구 + 같은 인자일 때만 doom loop으로 판단
         processor = SessionProcessor.get_or_create(session_id)
         is_doom_loop = processor.record_tool_call(tool_name, tool_args)
 
         if is_doom_loop:
-            error_output = f"Error: Doom loop detected - tool '{tool_name}' called repeatedly"
-            await Message.add_part(
-                message_id,
-                session_id,
-                MessagePart(
-                    id="",
-                    session_id=session_id,
-                    message_id=message_id,
-                    type="tool_result",
-                    tool_call_id=tool_call_id,
-                    tool_output=error_output
-                ),
-                user_id
-            )
-            return error_output, "error"
+            return f"Error: Doom loop detected - tool '{tool_name}' called repeatedly", "error", False
 
         # Registry에서 도구 가져오기
         registry = get_registry()
         tool = registry.get(tool_name)
 
         if not tool:
-            error_output = f"Error: Tool '{tool_name}' not found"
-            await Message.add_part(
-                message_id,
-                session_id,
-                MessagePart(
-                    id="",
-                    session_id=session_id,
-                    message_id=message_id,
-                    type="tool_result",
-                    tool_call_id=tool_call_id,
-                    tool_output=error_output
-                ),
-                user_id
-            )
-            return error_output, "error"
+            return f"Error: Tool '{tool_name}' not found", "error", False
 
         ctx = ToolContext(
             session_id=session_id,
@@ -619,46 +1001,38 @@ class SessionPrompt:
         )
 
         try:
-            result = await tool.execute(tool_args, ctx)
+            if limit:
+                async with cls._tool_semaphore:
+                    result = await tool.execute(tool_args, ctx)
+            else:
+                result = await tool.execute(tool_args, ctx)
 
             # 출력 길이 제한 적용
             truncated_output = tool.truncate_output(result.output)
             output = f"[{result.title}]\n{truncated_output}"
             status = "completed"
+            terminate = result.terminate
         except Exception as e:
             output = f"Error executing tool: {str(e)}"
             status = "error"
+            terminate = False
 
-        await Message.add_part(
-            message_id,
-            session_id,
-            MessagePart(
-                id="",
-                session_id=session_id,
-                message_id=message_id,
-                type="tool_result",
-                tool_call_id=tool_call_id,
-                tool_output=output
-            ),
-            user_id
-        )
-
-        return output, status
+        return output, status, terminate
     
     @classmethod
     def cancel(cls, session_id: str) -> bool:
         """Cancel an active session."""
         cancelled = False
         
-        if session_id in cls._active_sessions:
-            cls._active_sessions[session_id].cancel()
-            del cls._active_sessions[session_id]
+        task = cls._active_sessions.pop(session_id, None)
+        if task is not None:
+            task.cancel()
             cancelled = True
         
-        if session_id in cls._loop_states:
-            cls._loop_states[session_id].paused = True
-            cls._loop_states[session_id].pause_reason = "cancelled"
-            del cls._loop_states[session_id]
+        state = cls._loop_states.pop(session_id, None)
+        if state is not None:
+            state.paused = True
+            state.pause_reason = "cancelled"
             cancelled = True
         
         return cancelled
@@ -689,7 +1063,7 @@ class SessionPrompt:
             
             yield StreamChunk(type="text", text=f"\n[Resuming... step {state.step}/{state.max_steps}]\n")
             
-            async for chunk in cls._single_turn(session_id, continue_input, agent, is_continuation=True):
+            async for chunk in cls._single_turn(session_id, continue_input, agent, is_continuation=True, session=session):
                 yield chunk
                 
                 if chunk.type == "tool_call" and chunk.tool_call:
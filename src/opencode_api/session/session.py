@@ -1,11 +1,21 @@
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, List, Dict, Any, Set, Tuple
+from pydantic import BaseModel, TypeAdapter
+from collections import OrderedDict
 from datetime import datetime
+import asyncio
+import bisect
+import logging
+import time
 
 from ..core.storage import Storage, NotFoundError
 from ..core.bus import Bus, SESSION_CREATED, SESSION_UPDATED, SESSION_DELETED, SessionPayload
 from ..core.identifier import Identifier
-from ..core.supabase import get_client, is_enabled as supabase_enabled
+from ..core.clock import utc_now
+from ..core.supabase import get_client, is_enabled as supabase_enabled, run_sync
+from .message import discard_pending_parts
+
+
+logger = logging.getLogger(__name__)
 
 
 class SessionInfo(BaseModel):
@@ -19,6 +29,13 @@ class SessionInfo(BaseModel):
     agent_id: Optional[str] = None
     
     
+_TITLE_FMT = "Session {}"
+
+
+# 목록 검증기 - list마다 행 단위 model_validate 대신 한 번에 검증
+_SESSION_LIST_ADAPTER = TypeAdapter(List[SessionInfo])
+
+
 class SessionCreate(BaseModel):
     title: Optional[str] = None
     provider_id: Optional[str] = None
@@ -26,17 +43,168 @@ class SessionCreate(BaseModel):
     agent_id: Optional[str] = None
 
 
+def _updated_at_key(data: Dict[str, Any]) -> str:
+    """메모리(datetime)와 파일(ISO 문자열) 레코드를 같은 기준으로 비교"""
+    value = data.get("updated_at")
+    return value.isoformat() if isinstance(value, datetime) else str(value or "")
+
+
+# session_id -> updated_at 인덱스 - list가 전체 세션 파일을 읽지 않고 페이지만 읽도록
+# 항목별 키(["session-index", session_id])라 touch마다 해당 항목만 기록
+# ("session" 하위에 두면 Storage.list(["session"])에 섞이므로 별도 prefix)
+_INDEX_PREFIX = ["session-index"]
+_index: Optional[Dict[str, str]] = None
+_index_lock = asyncio.Lock()
+# list용 정렬 결과 ((updated_at, session_id) 오름차순) - 첫 list 때 만들고 이후 bisect로 항목만 갱신
+_index_order: Optional[List[Tuple[str, str]]] = None
+
+
+async def _load_index() -> Dict[str, str]:
+    global _index
+    if _index is not None:
+        return _index
+    async with _index_lock:
+        if _index is not None:
+            return _index
+        keys = await Storage.list(_INDEX_PREFIX)
+        if keys:
+            rows = await Storage.read_many(keys)
+            index = {key[-1]: row["updated_at"] for key, row in zip(keys, rows) if row}
+        else:
+            # 항목별 인덱스 도입 이전 데이터 - 단일 dict 키 또는 전체 스캔에서 한 번 변환
+            legacy = await Storage.read(_INDEX_PREFIX)
+            if legacy is not None:
+                index = dict(legacy)
+            else:
+                index = {}
+                for key in await Storage.list(["session"]):
+                    data = await Storage.read(key)
+                    if data:
+                        index[key[-1]] = _updated_at_key(data)
+            for session_id, updated_at in index.items():
+                await Storage.write(_INDEX_PREFIX + [session_id], {"updated_at": updated_at})
+            if legacy is not None:
+                await Storage.remove(_INDEX_PREFIX)
+        _index = index
+        return index
+
+
+def _order_remove(session_id: str, updated_at: str) -> None:
+    order = _index_order
+    if order is not None:
+        i = bisect.bisect_left(order, (updated_at, session_id))
+        if i < len(order) and order[i] == (updated_at, session_id):
+            del order[i]
+
+
+async def _index_set(session_id: str, data: Dict[str, Any]) -> None:
+    index = await _load_index()
+    updated_at = _updated_at_key(data)
+    old = index.get(session_id)
+    if old == updated_at:
+        return
+    index[session_id] = updated_at
+    if old is not None:
+        _order_remove(session_id, old)
+    if _index_order is not None:
+        bisect.insort(_index_order, (updated_at, session_id))
+    await Storage.write(_INDEX_PREFIX + [session_id], {"updated_at": updated_at})
+
+
+async def _index_remove(session_id: str) -> None:
+    index = await _load_index()
+    old = index.pop(session_id, None)
+    if old is not None:
+        _order_remove(session_id, old)
+        await Storage.remove(_INDEX_PREFIX + [session_id])
+
+
+def _page_ids(index: Dict[str, str], offset: int, limit: Optional[int]) -> List[str]:
+    """updated_at 내림차순 페이지 - 정렬은 처음 한 번만"""
+    global _index_order
+    if _index_order is None:
+        _index_order = sorted((updated_at, session_id) for session_id, updated_at in index.items())
+    order = _index_order
+    end = len(order) - offset
+    start = max(end - limit, 0) if limit else 0
+    if end <= 0:
+        return []
+    return [session_id for _, session_id in reversed(order[start:end])]
+
+
+class _TinyTTLCache:
+    """Session.get 결과 단기 캐시 (TTL + LRU) - 세션 변경은 Session을 거치므로 쓰기 시 무효화"""
+    
+    def __init__(self, ttl: float = 2.0, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, Tuple[float, Optional[str], SessionInfo]]" = OrderedDict()
+    
+    def get(self, session_id: str, user_id: Optional[str]) -> Optional[SessionInfo]:
+        item = self._items.get(session_id)
+        if item is None:
+            return None
+        expires, owner, info = item
+        if expires < time.monotonic():
+            del self._items[session_id]
+            return None
+        if owner != user_id:
+            return None
+        self._items.move_to_end(session_id)
+        return info
+    
+    def put(self, info: SessionInfo, user_id: Optional[str]) -> None:
+        self._items[info.id] = (time.monotonic() + self.ttl, user_id, info)
+        self._items.move_to_end(info.id)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+    
+    def invalidate(self, session_id: str) -> None:
+        self._items.pop(session_id, None)
+
+
+_session_cache = _TinyTTLCache()
+
+
+# Supabase touch 합치기 - 세션당 _TOUCH_DELAY 안의 touch는 update 한 번으로
+_TOUCH_DELAY = 2.0  # seconds
+_touch_handles: Dict[str, asyncio.TimerHandle] = {}
+_touch_tasks: Set[asyncio.Task] = set()
+
+
+def _schedule_touch(session_id: str, user_id: str) -> None:
+    if session_id in _touch_handles:
+        return
+    
+    def fire() -> None:
+        _touch_handles.pop(session_id, None)
+        task = asyncio.ensure_future(_flush_touch(session_id, user_id))
+        _touch_tasks.add(task)
+        task.add_done_callback(_touch_tasks.discard)
+    
+    _touch_handles[session_id] = asyncio.get_running_loop().call_later(_TOUCH_DELAY, fire)
+
+
+async def _flush_touch(session_id: str, user_id: str) -> None:
+    try:
+        await Session.update(session_id, {}, user_id)
+    except NotFoundError:
+        pass  # 그 사이 삭제된 세션
+    except Exception:
+        logger.exception("Failed to touch session %s", session_id)
+
+
 class Session:
     
     @staticmethod
     async def create(data: Optional[SessionCreate] = None, user_id: Optional[str] = None) -> SessionInfo:
         session_id = Identifier.generate("session")
-        now = datetime.utcnow()
+        now = utc_now()
         
         info = SessionInfo(
             id=session_id,
             user_id=user_id,
-            title=data.title if data and data.title else f"Session {now.isoformat()}",
+            title=data.title if data and data.title else _TITLE_FMT.format(now.isoformat(timespec="seconds")),
             created_at=now,
             updated_at=now,
             provider_id=data.provider_id if data else None,
@@ -46,114 +214,129 @@ class Session:
         
         if supabase_enabled() and user_id:
             client = get_client()
-            client.table("opencode_sessions").insert({
+            await run_sync(client.table("opencode_sessions").insert({
                 "id": session_id,
                 "user_id": user_id,
                 "title": info.title,
                 "agent_id": info.agent_id,
                 "provider_id": info.provider_id,
                 "model_id": info.model_id,
-            }).execute()
+            }).execute)
         else:
             await Storage.write(["session", session_id], info)
+            await _index_set(session_id, {"updated_at": now})
+        _session_cache.put(info, user_id)
         
         await Bus.publish(SESSION_CREATED, SessionPayload(id=session_id, title=info.title))
         return info
     
     @staticmethod
     async def get(session_id: str, user_id: Optional[str] = None) -> SessionInfo:
+        cached = _session_cache.get(session_id, user_id)
+        if cached is not None:
+            return cached
+        
         if supabase_enabled() and user_id:
             client = get_client()
-            result = client.table("opencode_sessions").select("*").eq("id", session_id).eq("user_id", user_id).single().execute()
+            result = await run_sync(client.table("opencode_sessions").select("*").eq("id", session_id).eq("user_id", user_id).single().execute)
             if not result.data:
                 raise NotFoundError(["session", session_id])
-            return SessionInfo(
-                id=result.data["id"],
-                user_id=result.data["user_id"],
-                title=result.data["title"],
-                created_at=result.data["created_at"],
-                updated_at=result.data["updated_at"],
-                provider_id=result.data.get("provider_id"),
-                model_id=result.data.get("model_id"),
-                agent_id=result.data.get("agent_id"),
-            )
-        
-        data = await Storage.read(["session", session_id])
-        if not data:
-            raise NotFoundError(["session", session_id])
-        return SessionInfo(**data)
+            info = SessionInfo.model_validate(result.data)
+        else:
+            data = await Storage.read(["session", session_id])
+            if not data:
+                raise NotFoundError(["session", session_id])
+            info = SessionInfo.model_validate(data)
+        _session_cache.put(info, user_id)
+        return info
     
     @staticmethod
     async def update(session_id: str, updates: Dict[str, Any], user_id: Optional[str] = None) -> SessionInfo:
-        updates["updated_at"] = datetime.utcnow().isoformat()
+        now = utc_now()
         
         if supabase_enabled() and user_id:
             client = get_client()
-            result = client.table("opencode_sessions").update(updates).eq("id", session_id).eq("user_id", user_id).execute()
+            updates["updated_at"] = now.isoformat()
+            result = await run_sync(client.table("opencode_sessions").update(updates).eq("id", session_id).eq("user_id", user_id).execute)
             if not result.data:
                 raise NotFoundError(["session", session_id])
-            return await Session.get(session_id, user_id)
+            # PostgREST update는 갱신된 행을 반환 - 재조회 불필요
+            info = SessionInfo.model_validate(result.data[0])
+            _session_cache.put(info, user_id)
+            await Bus.publish(SESSION_UPDATED, SessionPayload(id=session_id, title=info.title))
+            return info
+        
+        # 로컬 레코드는 create와 같이 datetime 그대로 보관 - 직렬화는 flush 시 한 번
+        updates["updated_at"] = now
         
         def updater(data: Dict[str, Any]):
             data.update(updates)
         
         data = await Storage.update(["session", session_id], updater)
-        info = SessionInfo(**data)
+        await _index_set(session_id, data)
+        info = SessionInfo.model_validate(data)
+        _session_cache.put(info, user_id)
         await Bus.publish(SESSION_UPDATED, SessionPayload(id=session_id, title=info.title))
         return info
     
     @staticmethod
     async def delete(session_id: str, user_id: Optional[str] = None) -> bool:
+        handle = _touch_handles.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+        _session_cache.invalidate(session_id)
+        
         if supabase_enabled() and user_id:
+            # cascade 삭제 뒤 늦게 insert되어 FK 위반이 나지 않도록 대기 중 파트 행 먼저 폐기
+            await discard_pending_parts(session_id)
             client = get_client()
-            client.table("opencode_sessions").delete().eq("id", session_id).eq("user_id", user_id).execute()
+            await run_sync(client.table("opencode_sessions").delete().eq("id", session_id).eq("user_id", user_id).execute)
             await Bus.publish(SESSION_DELETED, SessionPayload(id=session_id, title=""))
             return True
         
         info = await Session.get(session_id)
-        message_keys = await Storage.list(["message", session_id])
-        for key in message_keys:
-            await Storage.remove(key)
+        # Supabase는 FK ON DELETE CASCADE로 처리 - 파일 스토리지는 세션 단위 디렉토리 통째로 삭제
+        for prefix in ("message", "part", "message-meta"):
+            await Storage.remove_prefix([prefix, session_id])
         
         await Storage.remove(["session", session_id])
+        await _index_remove(session_id)
+        _session_cache.invalidate(session_id)
         await Bus.publish(SESSION_DELETED, SessionPayload(id=session_id, title=info.title))
         return True
     
     @staticmethod
-    async def list(limit: Optional[int] = None, user_id: Optional[str] = None) -> List[SessionInfo]:
+    async def list(limit: Optional[int] = None, user_id: Optional[str] = None, offset: int = 0) -> List[SessionInfo]:
         if supabase_enabled() and user_id:
             client = get_client()
             query = client.table("opencode_sessions").select("*").eq("user_id", user_id).order("updated_at", desc=True)
             if limit:
                 query = query.limit(limit)
-            result = query.execute()
-            return [
-                SessionInfo(
-                    id=row["id"],
-                    user_id=row["user_id"],
-                    title=row["title"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                    provider_id=row.get("provider_id"),
-                    model_id=row.get("model_id"),
-                    agent_id=row.get("agent_id"),
-                )
-                for row in result.data
-            ]
-        
-        session_keys = await Storage.list(["session"])
-        sessions = []
-        
-        for key in session_keys:
-            if limit and len(sessions) >= limit:
-                break
-            data = await Storage.read(key)
-            if data:
-                sessions.append(SessionInfo(**data))
-        
-        sessions.sort(key=lambda s: s.updated_at, reverse=True)
-        return sessions
+            if offset:
+                query = query.offset(offset)
+            result = await run_sync(query.execute)
+            return _SESSION_LIST_ADAPTER.validate_python(result.data)
+        
+        # 인덱스로 정렬/페이지 결정 후 해당 세션만 읽음
+        index = await _load_index()
+        session_ids = _page_ids(index, offset, limit)
+        
+        rows = await Storage.read_many([["session", session_id] for session_id in session_ids])
+        return _SESSION_LIST_ADAPTER.validate_python([data for data in rows if data])
     
     @staticmethod
     async def touch(session_id: str, user_id: Optional[str] = None) -> None:
-        await Session.update(session_id, {}, user_id)
+        if supabase_enabled() and user_id:
+            _schedule_touch(session_id, user_id)
+            return
+        
+        # updated_at만 갱신 - SessionInfo 검증/생성 생략
+        now = utc_now()
+        
+        def updater(data: Dict[str, Any]):
+            data["updated_at"] = now
+        
+        data = await Storage.update(["session", session_id], updater)
+        await _index_set(session_id, data)
+        _session_cache.invalidate(session_id)
+        await Bus.publish(SESSION_UPDATED, SessionPayload(id=session_id, title=data.get("title", "")))
@@ -1,6 +1,6 @@
 """Question tool - allows agent to ask user questions during execution."""
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Set, Tuple
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 import asyncio
 import logging
 
@@ -42,6 +42,18 @@ class QuestionReply(BaseModel):
     answers: List[List[str]] = Field(..., description="Answers in order (each is array of selected labels)")
 
 
+_QUESTIONS_ADAPTER = TypeAdapter(List[QuestionInfo])
+
+
+def _drop_invalid_options(question: Dict[str, Any]) -> Dict[str, Any]:
+    """dict가 아닌 옵션 제거 (모두 정상이면 원본 그대로 반환)"""
+    options = question.get("options")
+    if isinstance(options, list) and not all(isinstance(opt, dict) for opt in options):
+        logger.warning("[question] Skipping non-dict options in question: %r", question.get("question"))
+        return {**question, "options": [opt for opt in options if isinstance(opt, dict)]}
+    return question
+
+
 # Events
 QUESTION_ASKED = "question.asked"
 QUESTION_REPLIED = "question.replied"
@@ -49,7 +61,19 @@ QUESTION_REJECTED = "question.rejected"
 
 
 # Pending questions state
-_pending_questions: Dict[str, asyncio.Future] = {}
+_pending_questions: Dict[str, Tuple[str, asyncio.Future]] = {}  # request_id -> (session_id, future)
+_by_session: Dict[str, Set[str]] = {}  # session_id -> request_ids
+
+
+def _discard_pending(request_id: str) -> None:
+    entry = _pending_questions.pop(request_id, None)
+    if entry is None:
+        return
+    request_ids = _by_session.get(entry[0])
+    if request_ids is not None:
+        request_ids.discard(request_id)
+        if not request_ids:
+            del _by_session[entry[0]]
 
 
 async def ask_questions(
@@ -75,54 +99,54 @@ async def ask_questions(
     # 중요: get_running_loop() 사용 (get_event_loop()는 FastAPI에서 잘못된 loop 반환 가능)
     loop = asyncio.get_running_loop()
     future: asyncio.Future[List[List[str]]] = loop.create_future()
-    _pending_questions[request_id] = future
+    _pending_questions[request_id] = (session_id, future)
+    _by_session.setdefault(session_id, set()).add(request_id)
     
     # Publish question event (will be sent via SSE)
-    await Bus.publish(QUESTION_ASKED, request.model_dump())
+    await Bus.publish(QUESTION_ASKED, request)
     
     try:
         # Wait for reply with timeout
-        logger.info(f"[question] Waiting for answer to request_id={request_id}, timeout={timeout}s")
+        logger.info("[question] Waiting for answer to request_id=%s, timeout=%ss", request_id, timeout)
         answers = await asyncio.wait_for(future, timeout=timeout)
-        logger.info(f"[question] Received answer for request_id={request_id}: {answers}")
+        logger.info("[question] Received answer for request_id=%s", request_id)
         return answers
     except asyncio.TimeoutError:
-        logger.error(f"[question] Timeout for request_id={request_id} after {timeout}s")
-        del _pending_questions[request_id]
+        logger.error("[question] Timeout for request_id=%s after %ss", request_id, timeout)
         raise TimeoutError(f"Question timed out after {timeout} seconds")
     except Exception as e:
-        logger.error(f"[question] Error waiting for answer: {type(e).__name__}: {e}")
+        logger.error("[question] Error waiting for answer: %s: %s", type(e).__name__, e)
         raise
     finally:
-        if request_id in _pending_questions:
-            del _pending_questions[request_id]
+        _discard_pending(request_id)
 
 
 async def reply_to_question(request_id: str, answers: List[List[str]]) -> bool:
     """Submit answers to a pending question."""
-    logger.info(f"[question] reply_to_question called: request_id={request_id}, answers={answers}")
-    logger.info(f"[question] pending_questions keys: {list(_pending_questions.keys())}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[question] reply_to_question called: request_id=%s, answers=%r", request_id, answers)
 
-    if request_id not in _pending_questions:
-        logger.error(f"[question] request_id={request_id} NOT FOUND in pending_questions!")
+    entry = _pending_questions.get(request_id)
+    if entry is None:
+        logger.error("[question] request_id=%s NOT FOUND in pending_questions!", request_id)
         return False
 
-    future = _pending_questions[request_id]
+    future = entry[1]
     if not future.done():
-        logger.info(f"[question] Setting result for request_id={request_id}")
         future.set_result(answers)
     else:
-        logger.warning(f"[question] Future already done for request_id={request_id}")
+        logger.warning("[question] Future already done for request_id=%s", request_id)
 
     return True
 
 
 async def reject_question(request_id: str) -> bool:
     """Reject/dismiss a pending question."""
-    if request_id not in _pending_questions:
+    entry = _pending_questions.get(request_id)
+    if entry is None:
         return False
     
-    future = _pending_questions[request_id]
+    future = entry[1]
     if not future.done():
         future.set_exception(QuestionRejectedError())
     
@@ -130,8 +154,10 @@ async def reject_question(request_id: str) -> bool:
 
 
 def get_pending_questions(session_id: Optional[str] = None) -> List[str]:
-    """Get list of pending question request IDs."""
-    return list(_pending_questions.keys())
+    """Get list of pending question request IDs (all sessions if session_id is None)."""
+    if session_id is None:
+        return list(_pending_questions)
+    return list(_by_session.get(session_id, ()))
 
 
 class QuestionRejectedError(Exception):
@@ -156,6 +182,56 @@ Usage notes:
 """
 
 
+QUESTION_PARAMETERS: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "description": "Questions to ask",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {
+                        "type": "string",
+                        "description": "Complete question"
+                    },
+                    "header": {
+                        "type": "string",
+                        "description": "Very short label (max 30 chars)"
+                    },
+                    "options": {
+                        "type": "array",
+                        "description": "Available choices (MUST provide at least 2 options)",
+                        "minItems": 2,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "label": {
+                                    "type": "string",
+                                    "description": "Display text (1-5 words, concise)"
+                                },
+                                "description": {
+                                    "type": "string",
+                                    "description": "Explanation of choice"
+                                }
+                            },
+                            "required": ["label", "description"]
+                        }
+                    },
+                    "multiple": {
+                        "type": "boolean",
+                        "description": "Allow selecting multiple choices",
+                        "default": False
+                    }
+                },
+                "required": ["question", "header", "options"]
+            }
+        }
+    },
+    "required": ["questions"]
+}
+
+
 class QuestionTool(BaseTool):
     """Tool for asking user questions during execution."""
     
@@ -169,65 +245,12 @@ class QuestionTool(BaseTool):
     
     @property
     def parameters(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "questions": {
-                    "type": "array",
-                    "description": "Questions to ask",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "question": {
-                                "type": "string",
-                                "description": "Complete question"
-                            },
-                            "header": {
-                                "type": "string",
-                                "description": "Very short label (max 30 chars)"
-                            },
-                            "options": {
-                                "type": "array",
-                                "description": "Available choices (MUST provide at least 2 options)",
-                                "minItems": 2,
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "label": {
-                                            "type": "string",
-                                            "description": "Display text (1-5 words, concise)"
-                                        },
-                                        "description": {
-                                            "type": "string",
-                                            "description": "Explanation of choice"
-                                        }
-                                    },
-                                    "required": ["label", "description"]
-                                }
-                            },
-                            "multiple": {
-                                "type": "boolean",
-                                "description": "Allow selecting multiple choices",
-                                "default": False
-                            }
-                        },
-                        "required": ["question", "header", "options"]
-                    }
-                }
-            },
-            "required": ["questions"]
-        }
+        return QUESTION_PARAMETERS
     
     async def execute(self, args: Dict[str, Any], ctx: ToolContext) -> ToolResult:
-        logger.info(f"[question] execute called with args: {args}")
-        logger.info(f"[question] args type: {type(args)}")
-
         questions_data = args.get("questions", [])
-        logger.info(f"[question] questions_data type: {type(questions_data)}, len: {len(questions_data) if isinstance(questions_data, list) else 'N/A'}")
-
-        if questions_data and len(questions_data) > 0:
-            logger.info(f"[question] first question type: {type(questions_data[0])}")
-            logger.info(f"[question] first question content: {questions_data[0]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[question] execute called with questions: %r", questions_data)
         
         if not questions_data:
             return ToolResult(
@@ -236,36 +259,13 @@ class QuestionTool(BaseTool):
                 metadata={}
             )
         
-        # Parse questions
-        questions = []
+        # 문자열 등 dict가 아닌 질문/옵션은 기존처럼 건너뜀
         try:
-            for idx, q in enumerate(questions_data):
-                logger.info(f"[question] Parsing question {idx}: type={type(q)}, value={q}")
-
-                # q가 문자열인 경우 처리
-                if isinstance(q, str):
-                    logger.error(f"[question] Question {idx} is a string, not a dict!")
-                    continue
-
-                options = []
-                for opt_idx, opt in enumerate(q.get("options", [])):
-                    logger.info(f"[question] Parsing option {opt_idx}: type={type(opt)}, value={opt}")
-                    if isinstance(opt, dict):
-                        options.append(QuestionOption(label=opt["label"], description=opt["description"]))
-                    else:
-                        logger.error(f"[question] Option {opt_idx} is not a dict: {type(opt)}")
-
-                questions.append(QuestionInfo(
-                    question=q["question"],
-                    header=q["header"],
-                    options=options,
-                    multiple=q.get("multiple", False),
-                    custom=q.get("custom", True),
-                ))
-        except Exception as e:
-            logger.error(f"[question] Error parsing questions: {type(e).__name__}: {e}")
-            import traceback
-            logger.error(f"[question] Traceback: {traceback.format_exc()}")
+            questions = _QUESTIONS_ADAPTER.validate_python(
+                [_drop_invalid_options(q) for q in questions_data if isinstance(q, dict)]
+            )
+        except ValidationError:
+            logger.exception("[question] Error parsing questions")
             raise
         
         try:
@@ -298,7 +298,8 @@ class QuestionTool(BaseTool):
             return ToolResult(
                 title="Questions dismissed",
                 output="The user dismissed the questions without answering.",
-                metadata={"rejected": True}
+                metadata={"rejected": True},
+                terminate=True
             )
         except TimeoutError as e:
             return ToolResult(
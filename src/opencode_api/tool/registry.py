@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from .tool import BaseTool
 import os
 import importlib.util
@@ -9,22 +9,38 @@ class ToolRegistry:
 
     def __init__(self):
         self._tools: Dict[str, BaseTool] = {}
+        # 읽기 전용 스냅샷 - 등록 시에만 재생성 (등록은 시작 시 한 번, 조회는 매 요청)
+        self._tools_view: Tuple[BaseTool, ...] = ()
+        # 도구 구성이 바뀔 때마다 증가 - 스키마 캐시 키
+        self.version = 0
+        self._schema_cache: Optional[Tuple[int, List[Dict[str, Any]]]] = None
 
     def register(self, tool: BaseTool) -> None:
         """도구 등록"""
         self._tools[tool.id] = tool
+        self._tools_view = tuple(self._tools.values())
+        self.version += 1
+
+    def invalidate(self) -> None:
+        """도구 스키마가 바뀌었음을 알림 (예: 스킬 목록 변경)"""
+        self.version += 1
 
     def get(self, tool_id: str) -> Optional[BaseTool]:
         """도구 ID로 조회"""
         return self._tools.get(tool_id)
 
-    def list(self) -> List[BaseTool]:
-        """등록된 모든 도구 목록 반환"""
-        return list(self._tools.values())
+    def list(self) -> Tuple[BaseTool, ...]:
+        """등록된 모든 도구 목록 반환 (불변 스냅샷)"""
+        return self._tools_view
 
     def get_schema(self) -> List[Dict[str, Any]]:
-        """모든 도구의 스키마 반환"""
-        return [tool.get_schema() for tool in self._tools.values()]
+        """모든 도구의 스키마 반환 (version이 같으면 캐시된 리스트 재사용 - 수정 금지)"""
+        cached = self._schema_cache
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        schema = [tool.get_schema() for tool in self._tools_view]
+        self._schema_cache = (self.version, schema)
+        return schema
 
     def load_from_directory(self, path: str) -> None:
         """
@@ -1,8 +1,10 @@
 """Skill tool - loads detailed instructions for specific tasks."""
 from typing import Dict, Any, List, Optional
+import sys
 from pydantic import BaseModel, Field
 
 from .tool import BaseTool, ToolResult, ToolContext
+from .registry import get_registry
 
 
 class SkillInfo(BaseModel):
@@ -12,23 +14,55 @@ class SkillInfo(BaseModel):
     content: str
 
 
+class SkillRegistry:
+    """스킬 레지스트리 - 이름 키는 intern하여 보관"""
+    __slots__ = ("_by_name", "_rendered", "version")
+    
+    def __init__(self):
+        self._by_name: Dict[str, SkillInfo] = {}
+        self._rendered: Dict[str, str] = {}  # name -> execute 출력 (등록 시 한 번 생성)
+        self.version = 0  # register마다 증가 - SkillTool description/parameters 캐시 키
+    
+    def register(self, skill: SkillInfo) -> None:
+        name = sys.intern(skill.name)
+        self._by_name[name] = skill
+        self._rendered[name] = f"""## Skill: {skill.name}
+
+**Description**: {skill.description}
+
+{skill.content}
+"""
+        self.version += 1
+    
+    def get(self, name: str) -> Optional[SkillInfo]:
+        return self._by_name.get(name)
+    
+    def list(self) -> List[SkillInfo]:
+        return list(self._by_name.values())
+    
+    def rendered(self, name: str) -> str:
+        return self._rendered[name]
+
+
 # Built-in skills registry
-_skills: Dict[str, SkillInfo] = {}
+_skill_registry = SkillRegistry()
 
 
 def register_skill(skill: SkillInfo) -> None:
     """Register a skill."""
-    _skills[skill.name] = skill
+    _skill_registry.register(skill)
+    # skill 도구 description에 스킬 목록이 들어가므로 스키마 캐시 무효화
+    get_registry().invalidate()
 
 
 def get_skill(name: str) -> Optional[SkillInfo]:
     """Get a skill by name."""
-    return _skills.get(name)
+    return _skill_registry.get(name)
 
 
 def list_skills() -> List[SkillInfo]:
     """List all registered skills."""
-    return list(_skills.values())
+    return _skill_registry.list()
 
 
 # Built-in default skills
@@ -276,6 +310,11 @@ Guide for decomposing complex tasks into actionable steps.
 ]
 
 
+# 기본 스킬은 import 시 한 번만 등록 - SkillTool 생성마다 재등록하지 않음
+for _skill in DEFAULT_SKILLS:
+    _skill_registry.register(_skill)
+
+
 def _get_skill_description(skills: List[SkillInfo]) -> str:
     """Generate description with available skills."""
     if not skills:
@@ -290,12 +329,12 @@ def _get_skill_description(skills: List[SkillInfo]) -> str:
     ]
     
     for skill in skills:
-        lines.extend([
-            f"  <skill>",
-            f"    <name>{skill.name}</name>",
-            f"    <description>{skill.description}</description>",
-            f"  </skill>",
-        ])
+        lines.append(
+            f"  <skill>\n"
+            f"    <name>{skill.name}</name>\n"
+            f"    <description>{skill.description}</description>\n"
+            f"  </skill>"
+        )
     
     lines.append("</available_skills>")
     
@@ -307,30 +346,26 @@ class SkillTool(BaseTool):
     
     def __init__(self, additional_skills: Optional[List[SkillInfo]] = None):
         """Initialize with optional additional skills."""
-        # Register default skills
-        for skill in DEFAULT_SKILLS:
-            register_skill(skill)
-        
         # Register additional skills if provided
         if additional_skills:
             for skill in additional_skills:
                 register_skill(skill)
+        
+        self._cache_version = -1
+        self._cached_description = ""
+        self._cached_parameters: Dict[str, Any] = {}
     
-    @property
-    def id(self) -> str:
-        return "skill"
-    
-    @property
-    def description(self) -> str:
-        return _get_skill_description(list_skills())
-    
-    @property
-    def parameters(self) -> Dict[str, Any]:
-        skill_names = [s.name for s in list_skills()]
+    def _refresh(self) -> None:
+        """스킬 목록이 바뀐 경우에만 description/parameters 재생성"""
+        if self._cache_version == _skill_registry.version:
+            return
+        skills = list_skills()
+        skill_names = [s.name for s in skills]
         examples = ", ".join(f"'{n}'" for n in skill_names[:3])
         hint = f" (e.g., {examples}, ...)" if examples else ""
         
-        return {
+        self._cached_description = _get_skill_description(skills)
+        self._cached_parameters = {
             "type": "object",
             "properties": {
                 "name": {
@@ -341,6 +376,26 @@ class SkillTool(BaseTool):
             },
             "required": ["name"]
         }
+        self._cache_version = _skill_registry.version
+        self.invalidate_schema()
+    
+    def get_schema(self) -> Dict[str, Any]:
+        self._refresh()
+        return super().get_schema()
+    
+    @property
+    def id(self) -> str:
+        return "skill"
+    
+    @property
+    def description(self) -> str:
+        self._refresh()
+        return self._cached_description
+    
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        self._refresh()
+        return self._cached_parameters
     
     async def execute(self, args: Dict[str, Any], ctx: ToolContext) -> ToolResult:
         skill_name = args.get("name", "")
@@ -355,15 +410,8 @@ class SkillTool(BaseTool):
                 metadata={"error": True}
             )
         
-        output = f"""## Skill: {skill.name}
-
-**Description**: {skill.description}
-
-{skill.content}
-"""
-        
         return ToolResult(
             title=f"Loaded skill: {skill.name}",
-            output=output,
+            output=_skill_registry.rendered(skill.name),
             metadata={"name": skill.name}
         )
@@ -1,5 +1,5 @@
 from typing import Dict, Any, List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from .tool import BaseTool, ToolContext, ToolResult
 from ..core.storage import Storage
 
@@ -11,6 +11,62 @@ class TodoItem(BaseModel):
     priority: str = "medium"  # high, medium, low
 
 
+_TODO_LIST_ADAPTER = TypeAdapter(List[TodoItem])
+
+
+_STATUS_ICONS = {
+    "pending": "[ ]",
+    "in_progress": "[~]",
+    "completed": "[x]",
+    "cancelled": "[-]"
+}
+_PRIORITY_ICONS = {
+    "high": "!!!",
+    "medium": "!!",
+    "low": "!"
+}
+
+
+TODO_DESCRIPTION = (
+    "Manage a todo list for tracking tasks. Use this to create, update, "
+    "and track progress on multi-step tasks. Supports pending, in_progress, "
+    "completed, and cancelled statuses."
+)
+
+
+TODO_PARAMETERS: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "action": {
+            "type": "string",
+            "enum": ["read", "write"],
+            "description": "Action to perform: 'read' to get todos, 'write' to update todos"
+        },
+        "todos": {
+            "type": "array",
+            "description": "List of todos (required for 'write' action)",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "content": {"type": "string"},
+                    "status": {
+                        "type": "string",
+                        "enum": ["pending", "in_progress", "completed", "cancelled"]
+                    },
+                    "priority": {
+                        "type": "string", 
+                        "enum": ["high", "medium", "low"]
+                    }
+                },
+                "required": ["id", "content", "status", "priority"]
+            }
+        }
+    },
+    "required": ["action"]
+}
+
+
 class TodoTool(BaseTool):
     
     @property
@@ -19,45 +75,11 @@ class TodoTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return (
-            "Manage a todo list for tracking tasks. Use this to create, update, "
-            "and track progress on multi-step tasks. Supports pending, in_progress, "
-            "completed, and cancelled statuses."
-        )
+        return TODO_DESCRIPTION
     
     @property
     def parameters(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "action": {
-                    "type": "string",
-                    "enum": ["read", "write"],
-                    "description": "Action to perform: 'read' to get todos, 'write' to update todos"
-                },
-                "todos": {
-                    "type": "array",
-                    "description": "List of todos (required for 'write' action)",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "content": {"type": "string"},
-                            "status": {
-                                "type": "string",
-                                "enum": ["pending", "in_progress", "completed", "cancelled"]
-                            },
-                            "priority": {
-                                "type": "string", 
-                                "enum": ["high", "medium", "low"]
-                            }
-                        },
-                        "required": ["id", "content", "status", "priority"]
-                    }
-                }
-            },
-            "required": ["action"]
-        }
+        return TODO_PARAMETERS
     
     async def execute(self, args: Dict[str, Any], ctx: ToolContext) -> ToolResult:
         action = args["action"]
@@ -85,7 +107,7 @@ class TodoTool(BaseTool):
                 metadata={"count": 0}
             )
         
-        items = [TodoItem(**t) for t in todos]
+        items = _TODO_LIST_ADAPTER.validate_python(todos)
         lines = self._format_todos(items)
         
         return ToolResult(
@@ -95,8 +117,8 @@ class TodoTool(BaseTool):
         )
     
     async def _write_todos(self, session_id: str, todos_data: List[Dict]) -> ToolResult:
-        items = [TodoItem(**t) for t in todos_data]
-        await Storage.write(["todo", session_id], [t.model_dump() for t in items])
+        items = _TODO_LIST_ADAPTER.validate_python(todos_data)
+        await Storage.write(["todo", session_id], _TODO_LIST_ADAPTER.dump_python(items))
         
         lines = self._format_todos(items)
         
@@ -107,22 +129,10 @@ class TodoTool(BaseTool):
         )
     
     def _format_todos(self, items: List[TodoItem]) -> List[str]:
-        status_icons = {
-            "pending": "[ ]",
-            "in_progress": "[~]",
-            "completed": "[x]",
-            "cancelled": "[-]"
-        }
-        priority_icons = {
-            "high": "!!!",
-            "medium": "!!",
-            "low": "!"
-        }
-        
         lines = []
         for item in items:
-            icon = status_icons.get(item.status, "[ ]")
-            priority = priority_icons.get(item.priority, "")
+            icon = _STATUS_ICONS.get(item.status, "[ ]")
+            priority = _PRIORITY_ICONS.get(item.priority, "")
             lines.append(f"{icon} {priority} {item.content} (id: {item.id})")
         
         return lines if lines else ["No todos."]
@@ -1,22 +1,27 @@
-from typing import Dict, Any, List, Optional, Callable, Awaitable, Protocol, runtime_checkable
-from pydantic import BaseModel
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Protocol, runtime_checkable
 from abc import ABC, abstractmethod
-from datetime import datetime
+from dataclasses import dataclass, field
+import time
 
 
-class ToolContext(BaseModel):
+# 도구 호출마다 생성되는 내부 데이터 - 검증이 필요 없어 pydantic 대신 slots dataclass 사용
+@dataclass(slots=True)
+class ToolContext:
     session_id: str
     message_id: str
     tool_call_id: Optional[str] = None
     agent: str = "default"
 
 
-class ToolResult(BaseModel):
+@dataclass(slots=True)
+class ToolResult:
     title: str
     output: str
-    metadata: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = field(default_factory=dict)
     truncated: bool = False
     original_length: int = 0
+    # True면 agentic loop가 이 결과 이후 추가 LLM 호출 없이 종료
+    terminate: bool = False
 
 
 @runtime_checkable
@@ -39,8 +44,9 @@ class BaseTool(ABC):
 
     def __init__(self):
         self.status: str = "pending"
-        self.time_start: Optional[datetime] = None
-        self.time_end: Optional[datetime] = None
+        # time.monotonic_ns() 값 - 구간 측정 전용
+        self.time_start: Optional[int] = None
+        self.time_end: Optional[int] = None
 
     @property
     @abstractmethod
@@ -61,49 +67,64 @@ class BaseTool(ABC):
     async def execute(self, args: Dict[str, Any], ctx: ToolContext) -> ToolResult:
         pass
 
+    # 첫 get_schema 결과 캐시 - 런타임 상태에 따라 스키마가 바뀌는 도구는 invalidate_schema() 호출
+    _schema_cache: Optional[Dict[str, Any]] = None
+
     def get_schema(self) -> Dict[str, Any]:
-        return {
-            "name": self.id,
-            "description": self.description,
-            "parameters": self.parameters
-        }
+        if self._schema_cache is None:
+            self._schema_cache = {
+                "name": self.id,
+                "description": self.description,
+                "parameters": self.parameters
+            }
+        return self._schema_cache
+
+    def invalidate_schema(self) -> None:
+        self._schema_cache = None
 
     def truncate_output(self, output: str) -> str:
         """출력이 MAX_OUTPUT_LENGTH를 초과하면 자르고 메시지 추가"""
         if len(output) <= self.MAX_OUTPUT_LENGTH:
             return output
 
-        truncated = output[:self.MAX_OUTPUT_LENGTH]
-        truncated += "\n\n[Output truncated...]"
-        return truncated
+        return f"{output[:self.MAX_OUTPUT_LENGTH]}\n\n[Output truncated...]"
 
     def update_status(self, status: str) -> None:
         """도구 상태 업데이트 (pending, running, completed, error)"""
         self.status = status
         if status == "running" and self.time_start is None:
-            self.time_start = datetime.now()
+            self.time_start = time.monotonic_ns()
         elif status in ("completed", "error") and self.time_end is None:
-            self.time_end = datetime.now()
+            self.time_end = time.monotonic_ns()
+
+    @property
+    def duration_ns(self) -> Optional[int]:
+        if self.time_start is None or self.time_end is None:
+            return None
+        return self.time_end - self.time_start
 
 
 from .registry import get_registry
 
+# 전역 싱글톤을 한 번만 조회해 바인딩
+_registry = get_registry()
+
 
 def register_tool(tool: BaseTool) -> None:
     """도구 등록 (호환성 함수 - ToolRegistry 사용)"""
-    get_registry().register(tool)
+    _registry.register(tool)
 
 
 def get_tool(tool_id: str) -> Optional[BaseTool]:
     """도구 조회 (호환성 함수 - ToolRegistry 사용)"""
-    return get_registry().get(tool_id)
+    return _registry.get(tool_id)
 
 
-def list_tools() -> List[BaseTool]:
+def list_tools() -> Tuple[BaseTool, ...]:
     """도구 목록 (호환성 함수 - ToolRegistry 사용)"""
-    return get_registry().list()
+    return _registry.list()
 
 
 def get_tools_schema() -> List[Dict[str, Any]]:
     """도구 스키마 목록 (호환성 함수 - ToolRegistry 사용)"""
-    return get_registry().get_schema()
+    return _registry.get_schema()
@@ -1,7 +1,80 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import re
 import httpx
 from .tool import BaseTool, ToolContext, ToolResult
 
+# HTML 변환기는 모두 optional - import는 모듈 로드 시 한 번만 시도
+try:
+    # C 기반 lexbor 파서 (BeautifulSoup보다 훨씬 빠름)
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+try:
+    import html2text
+except ImportError:
+    html2text = None
+
+MAX_FETCH_BYTES = 200_000  # 응답 본문 최대 수신량
+
+# 커넥션 풀 재사용 - fetch마다 DNS/TLS 핸드셰이크 반복 방지
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """공유 HTTP 클라이언트 종료 (앱 종료 시)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# bs4가 없을 때의 정규식 fallback
+_SCRIPT_RE = re.compile(r"<script[^>]*>.*?</script>", re.DOTALL | re.IGNORECASE)
+_STYLE_RE = re.compile(r"<style[^>]*>.*?</style>", re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+
+
+WEBFETCH_DESCRIPTION = (
+    "Fetch content from a URL and convert it to readable text or markdown. "
+    "Use this when you need to read the content of a specific web page."
+)
+
+
+WEBFETCH_PARAMETERS: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "url": {
+            "type": "string",
+            "description": "The URL to fetch"
+        },
+        "format": {
+            "type": "string",
+            "enum": ["text", "markdown", "html"],
+            "description": "Output format (default: markdown)",
+            "default": "markdown"
+        }
+    },
+    "required": ["url"]
+}
+
 
 class WebFetchTool(BaseTool):
     
@@ -11,29 +84,11 @@ class WebFetchTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return (
-            "Fetch content from a URL and convert it to readable text or markdown. "
-            "Use this when you need to read the content of a specific web page."
-        )
+        return WEBFETCH_DESCRIPTION
     
     @property
     def parameters(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "url": {
-                    "type": "string",
-                    "description": "The URL to fetch"
-                },
-                "format": {
-                    "type": "string",
-                    "enum": ["text", "markdown", "html"],
-                    "description": "Output format (default: markdown)",
-                    "default": "markdown"
-                }
-            },
-            "required": ["url"]
-        }
+        return WEBFETCH_PARAMETERS
     
     async def execute(self, args: Dict[str, Any], ctx: ToolContext) -> ToolResult:
         url = args["url"]
@@ -43,15 +98,21 @@ class WebFetchTool(BaseTool):
             url = "https://" + url
         
         try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-                response = await client.get(
-                    url,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (compatible; OpenCode-API/1.0)"
-                    }
-                )
+            async with _get_client().stream(
+                "GET",
+                url,
+                headers={
+                    "User-Agent": "Mozilla/5.0 (compatible; OpenCode-API/1.0)"
+                }
+            ) as response:
                 response.raise_for_status()
-                html_content = response.text
+                # 출력은 어차피 50000자로 잘리므로 MAX_FETCH_BYTES까지만 받고 중단
+                buf = bytearray()
+                async for chunk in response.aiter_bytes(chunk_size=16384):
+                    buf.extend(chunk)
+                    if len(buf) >= MAX_FETCH_BYTES:
+                        break
+                html_content = buf.decode(response.encoding or "utf-8", errors="replace")
             
             if output_format == "html":
                 content = html_content[:50000]  # Limit size
@@ -89,29 +150,32 @@ class WebFetchTool(BaseTool):
             )
     
     def _html_to_text(self, html: str) -> str:
-        try:
-            from bs4 import BeautifulSoup
+        if LexborHTMLParser is not None:
+            tree = LexborHTMLParser(html)
+            for node in tree.css("script, style, nav, footer, header"):
+                node.decompose()
+            if tree.root is None:
+                return ""
+            return tree.root.text(separator="\n", strip=True)
+        
+        if BeautifulSoup is not None:
             soup = BeautifulSoup(html, "html.parser")
             
             for tag in soup(["script", "style", "nav", "footer", "header"]):
                 tag.decompose()
             
             return soup.get_text(separator="\n", strip=True)
-        except ImportError:
-            import re
-            text = re.sub(r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE)
-            text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
-            text = re.sub(r"<[^>]+>", " ", text)
-            text = re.sub(r"\s+", " ", text)
-            return text.strip()
+        
+        text = _SCRIPT_RE.sub("", html)
+        text = _STYLE_RE.sub("", text)
+        text = _TAG_RE.sub(" ", text)
+        return _WS_RE.sub(" ", text).strip()
     
     def _html_to_markdown(self, html: str) -> str:
-        try:
-            import html2text
-            h = html2text.HTML2Text()
-            h.ignore_links = False
-            h.ignore_images = True
-            h.body_width = 0
-            return h.handle(html)
-        except ImportError:
+        if html2text is None:
             return self._html_to_text(html)
+        h = html2text.HTML2Text()
+        h.ignore_links = False
+        h.ignore_images = True
+        h.body_width = 0
+        return h.handle(html)
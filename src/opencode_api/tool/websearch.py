@@ -1,7 +1,40 @@
 from typing import Dict, Any, List
+import asyncio
 from .tool import BaseTool, ToolContext, ToolResult
 
 
+WEBSEARCH_DESCRIPTION = (
+    "Search the web using DuckDuckGo. Returns relevant search results "
+    "with titles, URLs, and snippets. Use this when you need current "
+    "information from the internet."
+)
+
+
+WEBSEARCH_PARAMETERS: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "query": {
+            "type": "string",
+            "description": "The search query"
+        },
+        "max_results": {
+            "type": "integer",
+            "description": "Maximum number of results to return (default: 5)",
+            "default": 5
+        }
+    },
+    "required": ["query"]
+}
+
+
+def _do_search(query: str, max_results: int) -> List[Dict[str, Any]]:
+    from ddgs import DDGS
+    
+    with DDGS() as ddgs:
+        # 한국 지역 기반 검색 결과
+        return list(ddgs.text(query, region="kr-kr", max_results=max_results))
+
+
 class WebSearchTool(BaseTool):
     
     @property
@@ -10,65 +43,36 @@ class WebSearchTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return (
-            "Search the web using DuckDuckGo. Returns relevant search results "
-            "with titles, URLs, and snippets. Use this when you need current "
-            "information from the internet."
-        )
+        return WEBSEARCH_DESCRIPTION
     
     @property
     def parameters(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "The search query"
-                },
-                "max_results": {
-                    "type": "integer",
-                    "description": "Maximum number of results to return (default: 5)",
-                    "default": 5
-                }
-            },
-            "required": ["query"]
-        }
+        return WEBSEARCH_PARAMETERS
     
     async def execute(self, args: Dict[str, Any], ctx: ToolContext) -> ToolResult:
         query = args["query"]
         max_results = args.get("max_results", 5)
         
         try:
-            from ddgs import DDGS
-
-            results = []
-            with DDGS() as ddgs:
-                # 한국 지역 기반 검색 결과
-                for r in ddgs.text(query, region="kr-kr", max_results=max_results):
-                    results.append({
-                        "title": r.get("title", ""),
-                        "url": r.get("href", ""),
-                        "snippet": r.get("body", "")
-                    })
+            # 동기 HTTP 호출 - 이벤트 루프를 막지 않도록 워커 스레드에서 실행
+            raw = await asyncio.to_thread(_do_search, query, max_results)
             
-            if not results:
+            if not raw:
                 return ToolResult(
                     title=f"Web search: {query}",
                     output="No results found.",
                     metadata={"query": query, "count": 0}
                 )
             
-            output_lines = []
-            for i, r in enumerate(results, 1):
-                output_lines.append(f"{i}. {r['title']}")
-                output_lines.append(f"   URL: {r['url']}")
-                output_lines.append(f"   {r['snippet']}")
-                output_lines.append("")
+            output = "\n".join(
+                f"{i}. {r.get('title', '')}\n   URL: {r.get('href', '')}\n   {r.get('body', '')}\n"
+                for i, r in enumerate(raw, 1)
+            )
             
             return ToolResult(
                 title=f"Web search: {query}",
-                output="\n".join(output_lines),
-                metadata={"query": query, "count": len(results)}
+                output=output,
+                metadata={"query": query, "count": len(raw)}
             )
             
         except ImportError:
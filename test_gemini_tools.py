@@ -4,6 +4,8 @@ Test script for Gemini Extended Thinking + Tool Calling integration.
 Tests that thinking and tool calls work together correctly.
 """
 import asyncio
+import functools
+import io
 import os
 import sys
 
@@ -17,6 +19,10 @@ from opencode_api.provider.gemini import GeminiProvider
 from opencode_api.provider.provider import Message
 
 
+# Set GEMINI_TEST_VERBOSE=0 to skip per-chunk output (e.g. in CI)
+VERBOSE = os.getenv("GEMINI_TEST_VERBOSE", "1") != "0"
+
+
 # Define test tools schema
 TEST_TOOLS = [
     {
@@ -50,20 +56,19 @@ TEST_TOOLS = [
 ]
 
 
-async def test_thinking_only():
+async def check_thinking_only(provider: GeminiProvider, out: io.StringIO):
     """Test that thinking works without tools."""
-    print("\n" + "="*60)
-    print("TEST 1: Thinking Only (No Tools)")
-    print("="*60)
-    
-    provider = GeminiProvider(api_key=os.getenv("GOOGLE_API_KEY"))
+    log = functools.partial(print, file=out)
+    log("\n" + "="*60)
+    log("TEST 1: Thinking Only (No Tools)")
+    log("="*60)
     
     messages = [
         Message(role="user", content="3개의 상자가 있어. 하나에는 금, 하나에는 은, 하나에는 돌이 있어. 상자1: '여기에 금이 없다', 상자2: '여기에 금이 있다', 상자3: '금은 상자1에 있다'. 정확히 하나만 진실이야. 금은 어디?")
     ]
     
-    reasoning_chunks = []
-    text_chunks = []
+    reasoning_count = 0
+    text_count = 0
     tool_calls = []
     usage = None
     
@@ -74,44 +79,45 @@ async def test_thinking_only():
         system="You are a helpful assistant. Think step by step."
     ):
         if chunk.type == "reasoning":
-            reasoning_chunks.append(chunk.text)
-            print(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
+            reasoning_count += 1
+            if VERBOSE:
+                log(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
         elif chunk.type == "text":
-            text_chunks.append(chunk.text)
-            print(f"[TEXT] {chunk.text}", end="", flush=True)
+            text_count += 1
+            if VERBOSE:
+                log(f"[TEXT] {chunk.text}", end="", flush=True)
         elif chunk.type == "tool_call":
             tool_calls.append(chunk.tool_call)
-            print(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
+            log(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
         elif chunk.type == "done":
             usage = chunk.usage
-            print(f"\n[DONE] stop_reason={chunk.stop_reason}")
+            log(f"\n[DONE] stop_reason={chunk.stop_reason}")
         elif chunk.type == "error":
-            print(f"\n[ERROR] {chunk.error}")
+            log(f"\n[ERROR] {chunk.error}")
     
-    print("\n--- Summary ---")
-    print(f"Reasoning chunks: {len(reasoning_chunks)}")
-    print(f"Text chunks: {len(text_chunks)}")
-    print(f"Tool calls: {len(tool_calls)}")
+    log("\n--- Summary ---")
+    log(f"Reasoning chunks: {reasoning_count}")
+    log(f"Text chunks: {text_count}")
+    log(f"Tool calls: {len(tool_calls)}")
     if usage:
-        print(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
+        log(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
     
-    return len(reasoning_chunks) > 0
+    return reasoning_count > 0
 
 
-async def test_tool_calling():
+async def check_tool_calling(provider: GeminiProvider, out: io.StringIO):
     """Test that tool calling works."""
-    print("\n" + "="*60)
-    print("TEST 2: Tool Calling (Should trigger web_search)")
-    print("="*60)
-    
-    provider = GeminiProvider(api_key=os.getenv("GOOGLE_API_KEY"))
+    log = functools.partial(print, file=out)
+    log("\n" + "="*60)
+    log("TEST 2: Tool Calling (Should trigger web_search)")
+    log("="*60)
     
     messages = [
         Message(role="user", content="2024년 노벨 물리학상 수상자가 누구야? 웹 검색해서 알려줘.")
     ]
     
-    reasoning_chunks = []
-    text_chunks = []
+    reasoning_count = 0
+    text_count = 0
     tool_calls = []
     usage = None
     
@@ -122,47 +128,48 @@ async def test_tool_calling():
         system="You are a helpful assistant. Use tools when needed."
     ):
         if chunk.type == "reasoning":
-            reasoning_chunks.append(chunk.text)
-            print(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
+            reasoning_count += 1
+            if VERBOSE:
+                log(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
         elif chunk.type == "text":
-            text_chunks.append(chunk.text)
-            print(f"[TEXT] {chunk.text}", end="", flush=True)
+            text_count += 1
+            if VERBOSE:
+                log(f"[TEXT] {chunk.text}", end="", flush=True)
         elif chunk.type == "tool_call":
             tool_calls.append(chunk.tool_call)
-            print(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
+            log(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
         elif chunk.type == "done":
             usage = chunk.usage
-            print(f"\n[DONE] stop_reason={chunk.stop_reason}")
+            log(f"\n[DONE] stop_reason={chunk.stop_reason}")
         elif chunk.type == "error":
-            print(f"\n[ERROR] {chunk.error}")
+            log(f"\n[ERROR] {chunk.error}")
     
-    print("\n--- Summary ---")
-    print(f"Reasoning chunks: {len(reasoning_chunks)}")
-    print(f"Text chunks: {len(text_chunks)}")
-    print(f"Tool calls: {len(tool_calls)}")
+    log("\n--- Summary ---")
+    log(f"Reasoning chunks: {reasoning_count}")
+    log(f"Text chunks: {text_count}")
+    log(f"Tool calls: {len(tool_calls)}")
     for tc in tool_calls:
-        print(f"  - {tc.name}: {tc.arguments}")
+        log(f"  - {tc.name}: {tc.arguments}")
     if usage:
-        print(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
+        log(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
     
     return len(tool_calls) > 0
 
 
-async def test_thinking_with_tools():
+async def check_thinking_with_tools(provider: GeminiProvider, out: io.StringIO):
     """Test that thinking AND tool calling work together."""
-    print("\n" + "="*60)
-    print("TEST 3: Thinking + Tool Calling Together")
-    print("="*60)
-    
-    provider = GeminiProvider(api_key=os.getenv("GOOGLE_API_KEY"))
+    log = functools.partial(print, file=out)
+    log("\n" + "="*60)
+    log("TEST 3: Thinking + Tool Calling Together")
+    log("="*60)
     
     # Complex question that requires both thinking and tool use
     messages = [
         Message(role="user", content="복잡한 수학 문제야: (17 * 23) + (45 / 9) - 12^2 를 계산해줘. 계산기 도구를 사용해서 정확한 답을 구해줘.")
     ]
     
-    reasoning_chunks = []
-    text_chunks = []
+    reasoning_count = 0
+    text_count = 0
     tool_calls = []
     usage = None
     
@@ -173,47 +180,48 @@ async def test_thinking_with_tools():
         system="You are a helpful assistant. Use the calculator tool for mathematical operations. Think through the problem step by step."
     ):
         if chunk.type == "reasoning":
-            reasoning_chunks.append(chunk.text)
-            print(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
+            reasoning_count += 1
+            if VERBOSE:
+                log(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
         elif chunk.type == "text":
-            text_chunks.append(chunk.text)
-            print(f"[TEXT] {chunk.text}", end="", flush=True)
+            text_count += 1
+            if VERBOSE:
+                log(f"[TEXT] {chunk.text}", end="", flush=True)
         elif chunk.type == "tool_call":
             tool_calls.append(chunk.tool_call)
-            print(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
+            log(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
         elif chunk.type == "done":
             usage = chunk.usage
-            print(f"\n[DONE] stop_reason={chunk.stop_reason}")
+            log(f"\n[DONE] stop_reason={chunk.stop_reason}")
         elif chunk.type == "error":
-            print(f"\n[ERROR] {chunk.error}")
+            log(f"\n[ERROR] {chunk.error}")
     
-    print("\n--- Summary ---")
-    print(f"Reasoning chunks: {len(reasoning_chunks)}")
-    print(f"Text chunks: {len(text_chunks)}")
-    print(f"Tool calls: {len(tool_calls)}")
+    log("\n--- Summary ---")
+    log(f"Reasoning chunks: {reasoning_count}")
+    log(f"Text chunks: {text_count}")
+    log(f"Tool calls: {len(tool_calls)}")
     for tc in tool_calls:
-        print(f"  - {tc.name}: {tc.arguments}")
+        log(f"  - {tc.name}: {tc.arguments}")
     if usage:
-        print(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
+        log(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
     
     # Success if we got both reasoning and tool calls, OR just tool calls (model might not always think)
     return len(tool_calls) > 0
 
 
-async def test_flash_model():
+async def check_flash_model(provider: GeminiProvider, out: io.StringIO):
     """Test that Flash model also works with thinking + tools."""
-    print("\n" + "="*60)
-    print("TEST 4: Gemini 2.5 Flash with Thinking + Tools")
-    print("="*60)
-    
-    provider = GeminiProvider(api_key=os.getenv("GOOGLE_API_KEY"))
+    log = functools.partial(print, file=out)
+    log("\n" + "="*60)
+    log("TEST 4: Gemini 2.5 Flash with Thinking + Tools")
+    log("="*60)
     
     messages = [
         Message(role="user", content="오늘 서울 날씨 어때? 웹에서 검색해줘.")
     ]
     
-    reasoning_chunks = []
-    text_chunks = []
+    reasoning_count = 0
+    text_count = 0
     tool_calls = []
     usage = None
     
@@ -224,26 +232,28 @@ async def test_flash_model():
         system="You are a helpful assistant. Use tools when needed."
     ):
         if chunk.type == "reasoning":
-            reasoning_chunks.append(chunk.text)
-            print(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
+            reasoning_count += 1
+            if VERBOSE:
+                log(f"[REASONING] {chunk.text[:100]}..." if len(chunk.text) > 100 else f"[REASONING] {chunk.text}")
         elif chunk.type == "text":
-            text_chunks.append(chunk.text)
-            print(f"[TEXT] {chunk.text}", end="", flush=True)
+            text_count += 1
+            if VERBOSE:
+                log(f"[TEXT] {chunk.text}", end="", flush=True)
         elif chunk.type == "tool_call":
             tool_calls.append(chunk.tool_call)
-            print(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
+            log(f"\n[TOOL_CALL] {chunk.tool_call.name}({chunk.tool_call.arguments})")
         elif chunk.type == "done":
             usage = chunk.usage
-            print(f"\n[DONE] stop_reason={chunk.stop_reason}")
+            log(f"\n[DONE] stop_reason={chunk.stop_reason}")
         elif chunk.type == "error":
-            print(f"\n[ERROR] {chunk.error}")
+            log(f"\n[ERROR] {chunk.error}")
     
-    print("\n--- Summary ---")
-    print(f"Reasoning chunks: {len(reasoning_chunks)}")
-    print(f"Text chunks: {len(text_chunks)}")
-    print(f"Tool calls: {len(tool_calls)}")
+    log("\n--- Summary ---")
+    log(f"Reasoning chunks: {reasoning_count}")
+    log(f"Text chunks: {text_count}")
+    log(f"Tool calls: {len(tool_calls)}")
     if usage:
-        print(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
+        log(f"Usage: input={usage.get('input_tokens', 0)}, output={usage.get('output_tokens', 0)}, thinking={usage.get('thinking_tokens', 0)}")
     
     return True  # Flash might not always use tools
 
@@ -260,32 +270,31 @@ async def main():
     
     print(f"API Key: {api_key[:10]}...{api_key[-4:]}")
     
-    results = {}
+    # Share one provider (and its lazily created genai client) across all tests
+    provider = GeminiProvider(api_key=api_key)
     
-    # Run tests
-    try:
-        results["thinking_only"] = await test_thinking_only()
-    except Exception as e:
-        print(f"TEST 1 FAILED: {e}")
-        results["thinking_only"] = False
-    
-    try:
-        results["tool_calling"] = await test_tool_calling()
-    except Exception as e:
-        print(f"TEST 2 FAILED: {e}")
-        results["tool_calling"] = False
-    
-    try:
-        results["thinking_with_tools"] = await test_thinking_with_tools()
-    except Exception as e:
-        print(f"TEST 3 FAILED: {e}")
-        results["thinking_with_tools"] = False
+    results = {}
     
-    try:
-        results["flash_model"] = await test_flash_model()
-    except Exception as e:
-        print(f"TEST 4 FAILED: {e}")
-        results["flash_model"] = False
+    # Run tests concurrently - each test buffers its output so streams don't interleave
+    tests = {
+        "thinking_only": check_thinking_only,
+        "tool_calling": check_tool_calling,
+        "thinking_with_tools": check_thinking_with_tools,
+        "flash_model": check_flash_model,
+    }
+    outputs = {name: io.StringIO() for name in tests}
+    outcomes = await asyncio.gather(
+        *(check(provider, outputs[name]) for name, check in tests.items()),
+        return_exceptions=True,
+    )
+    
+    for i, (name, outcome) in enumerate(zip(tests, outcomes), 1):
+        print(outputs[name].getvalue(), end="")
+        if isinstance(outcome, BaseException):
+            print(f"TEST {i} FAILED: {outcome}")
+            results[name] = False
+        else:
+            results[name] = outcome
     
     # Final summary
     print("\n" + "="*60)